@@ -0,0 +1,43 @@
+import asyncio, contextvars, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import app.api as api
+
+class AsyncDB:
+    "Async facade over `app.api`: `await adb.get_user(auth)` runs the blocking call on a bounded thread pool"
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="db")
+        self.lock = threading.Lock()
+        self.queued = self.running = self.max_queued = self.completed = 0
+        self.queue_wait = self.max_queue_wait = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        "Run `fn(*args, **kwargs)` on the pool, keeping the caller's context vars (e.g. `request_user`)"
+        ctx, submitted = contextvars.copy_context(), time.perf_counter()
+        with self.lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        def call():
+            wait = time.perf_counter() - submitted
+            with self.lock:
+                self.queued, self.running = self.queued-1, self.running+1
+                self.queue_wait, self.max_queue_wait = self.queue_wait+wait, max(self.max_queue_wait, wait)
+            try: return ctx.run(fn, *args, **kwargs)
+            finally:
+                with self.lock: self.running, self.completed = self.running-1, self.completed+1
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def __getattr__(self, name):
+        fn = getattr(api, name)
+        if not callable(fn): raise AttributeError(name)
+        return partial(self.run, fn)
+
+    def stats(self):
+        return dict(max_workers=self.max_workers, queued=self.queued, running=self.running, max_queued=self.max_queued,
+                    completed=self.completed, queue_wait_avg=self.queue_wait/self.completed if self.completed else 0.0,
+                    queue_wait_max=self.max_queue_wait)
+
+    def shutdown(self): self.executor.shutdown(wait=True)
+
+adb = AsyncDB(int(os.getenv("DB_EXECUTOR_WORKERS", 4)))
@@ -1,55 +1,109 @@
+import os
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
-from app.db import get_database
-db = get_database()
-
-Project = db.t.project.dataclass()
-Blog = db.t.blog.dataclass()
+from app.db import ConnectionPool
+from app.cache import TTLCache, PageCache
+from app.views import ViewCounter
+from app.search import search, fts_query
+from app.github import GitHubStats
+from app.backup import Backups, restore
+from app.timing import timed
+from app.metrics import metrics
+from app.walbackup import WalShipper
+# With WAL_BACKUP_DIR set only the shipper checkpoints, so no frame is checkpointed away before it has been shipped
+WAL_BACKUP_DIR = os.getenv("WAL_BACKUP_DIR")
+# Reads use a per-thread connection from `reader()`; writes take turns on the single connection from `writer()`
+pool = ConnectionPool(pragmas=dict(wal_autocheckpoint=0) if WAL_BACKUP_DIR else None)
+reader, writer = pool.reader, pool.write
+view_counter = ViewCounter(pool, flush_interval=float(os.getenv("VIEW_FLUSH_INTERVAL", 5)))
+
+# Users resolved across requests, plus the one the Auth beforeware loaded for the current request
+user_cache = TTLCache(maxsize=256, ttl=float(os.getenv("USER_CACHE_TTL", 300)))
+request_user = ContextVar('request_user', default=None)
+# Set for boosted navigations, which only need the page's #content region (see `CommonScreen`)
+partial_request = ContextVar('partial_request', default=False)
+
+@timed
+def content_stamp():
+    "`(version, last_modified)` of everything public pages show: the newest blog/project edit and the view-count epoch"
+    blog, project, epoch, flushed = reader().execute(
+        "SELECT (SELECT max(updated_at) FROM blog), (SELECT max(updated_at) FROM project), epoch, flushed_at FROM view_epoch WHERE id = 1").fetchone()
+    return (blog, project, epoch), max(filter(None, (blog, project, flushed)), default=None)
+
+# Rendered pages; every write that changes what they show calls `page_cache.invalidate()`
+page_cache = PageCache(maxsize=int(os.getenv("PAGE_CACHE_SIZE", 256)), ttl=float(os.getenv("PAGE_CACHE_TTL", 60)),
+                       enabled=os.getenv("PAGE_CACHE", "1") != "0", stamp=content_stamp)
+
+# GitHub profile stats shown in GithubInsights, cached in SQLite for GITHUB_CACHE_TTL seconds
+github_stats = GitHubStats(pool, ttl=float(os.getenv("GITHUB_CACHE_TTL", 600)))
+
+# Point-in-time database snapshots for /admin/backup, kept for BACKUP_TTL seconds after they finish
+backups = Backups(pool.path, dir=os.getenv("BACKUP_DIR"), ttl=float(os.getenv("BACKUP_TTL", 3600)))
+
+# Continuous WAL backups to WAL_BACKUP_DIR every WAL_BACKUP_INTERVAL seconds; `python -m app.walbackup` restores them
+wal_shipper = WalShipper(pool, WAL_BACKUP_DIR, interval=float(os.getenv("WAL_BACKUP_INTERVAL", 10)),
+                         retention=float(os.getenv("WAL_BACKUP_RETENTION_DAYS", 7)) * 86400)
+
+Project = pool.dataclass('project')
+Blog = pool.dataclass('blog')
+User = pool.dataclass('user')
+Contact = pool.dataclass('contact')
 
 def create_user_from_github(info):
-    users = db.t.user
-    return users.insert(github_id=info['id'], username=info['login'], email=info['email'] or '', display_name=info['name'] or info['login'],
-                            avatar_url=info['avatar_url'], bio=info['bio'] or '', created_at=datetime.now().isoformat(),
-                            last_login=datetime.now().isoformat(), is_admin=False)
+    user_cache.pop(info['id'])
+    with writer() as db:
+        return db.t.user.insert(github_id=info['id'], username=info['login'], email=info['email'] or '', display_name=info['name'] or info['login'],
+                                avatar_url=info['avatar_url'], bio=info['bio'] or '', created_at=datetime.now().isoformat(),
+                                last_login=datetime.now().isoformat(), is_admin=False)
 
 def update_sign_in_latest(user):
-    users = db.t.user
     user.last_login = datetime.now().isoformat()
-    return users.update(user)
+    user_cache.pop(user.github_id)
+    with writer() as db: return db.t.user.update(user)
 
 def sign_in(info):
-    users = db.t.user
+    users = reader().t.user
     user = users(where="github_id=?", where_args=(info['id'],))
     if user: return update_sign_in_latest(user[0])
     else:    return create_user_from_github(info)
 
+@timed
 def get_user(auth):
-    users = db.t.user
+    if not auth: return None
+    user = request_user.get()
+    if user is not None and user.github_id == auth: return user
+    user = user_cache.get(auth)
+    if user is not None: return user
+    users = reader().t.user
     user = users(where="github_id=?", where_args=(auth,))
-    return user[0] if user else None
+    return user_cache.set(auth, user[0]) if user else None
 
 def store_contact_request(contact):
-    contacts = db.t.contact
-    return contacts.insert(name=contact['name'], email=contact['email'], message=contact['message'], created_at=datetime.now().isoformat(), deleted=False, responded=False, response_date=None)
+    with writer() as db:
+        res = db.t.contact.insert(name=contact['name'], email=contact['email'], message=contact['message'], created_at=datetime.now().isoformat(), deleted=False, responded=False, response_date=None)
+    metrics.inc('db_rows_written_total', table='contact', op='insert')
+    return res
 
+@timed
 def get_contact_requests():
-    contacts = db.t.contact
+    contacts = reader().t.contact
     return contacts(where="deleted=?", where_args=(False,))
 
 def delete_contact_request(id):
-    contacts = db.t.contact
-    return contacts.update(id=id, deleted=True)
+    with writer() as db: return db.t.contact.update(id=id, deleted=True)
 
 def mark_contact_request_responded(id):
-    contacts = db.t.contact
-    return contacts.update(id=id, responded=True, response_date=datetime.now().isoformat())
+    with writer() as db: return db.t.contact.update(id=id, responded=True, response_date=datetime.now().isoformat())
 
+@timed
 def homepage_projects():
-    projects = db.t.project
-    return projects(where="featured=?", where_args=(True,), order="created_at DESC", limit=3)
+    projects = reader().t.project
+    return projects(where="featured=?", where_args=(True,), order_by="created_at DESC", limit=3)
 
+@timed
 def get_projects(statuses=None, tags=None, featured=None, newest=True):
-    projects = db.t.project
+    projects = reader().t.project
     where_clauses = []
     where_args = []
     
@@ -57,8 +111,9 @@ def get_projects(statuses=None, tags=None, featured=None, newest=True):
         where_clauses.append("status IN (?)")
         where_args.extend(statuses)
     if tags:
-        where_clauses.append("tags LIKE ?")
-        where_args.append(f"%{tags}%")
+        # Matched through the full-text index rather than a `LIKE '%...%'` table scan
+        where_clauses.append("id IN (SELECT rowid FROM project_fts WHERE project_fts MATCH ?)")
+        where_args.append(f"tags : ({fts_query(tags)})")
     if featured:
         where_clauses.append("featured=?")
         where_args.append(featured)
@@ -75,34 +130,99 @@ def get_projects(statuses=None, tags=None, featured=None, newest=True):
     )
 
 def create_project(project:Project):
-    projects = db.t.project
     project.created_at = datetime.now().isoformat()
     project.updated_at = project.created_at
-    return projects.insert(project)
+    with writer() as db: res = db.t.project.insert(project)
+    page_cache.invalidate()
+    return res
 
 def create_blog_post(blog:Blog):
-    blogs = db.t.blog
     blog.created_at = datetime.now().isoformat()
     blog.updated_at = blog.created_at
     blog.views = 0
-    return blogs.insert(blog)
+    with writer() as db: res = db.t.blog.insert(blog)
+    page_cache.invalidate()
+    return res
 
+@timed
 def get_blog_posts():
-    blogs = db.t.blog
-    return blogs(where="published=?", where_args=(True,))
+    blogs = reader().t.blog
+    return [view_counter.merge(o) for o in blogs(where="published=?", where_args=(True,))]
 
+@timed
 def get_blog_post(slug:str):
-    blogs = db.t.blog
+    blogs = reader().t.blog
     matched = blogs(where="url_slug=?", where_args=(slug,))
-    return matched[0] if matched else None
+    return view_counter.merge(matched[0]) if matched else None
 
-def add_blog_view(slug:str):
-    blogs = db.t.blog
-    matched = blogs(where="url_slug=?", where_args=(slug,))
-    if matched:
-        matched[0].views = int(matched[0].views) + 1
-        return blogs.update(matched[0])
+@timed
+def blog_exists(slug:str):
+    "One lookup on the unique `url_slug` index, without loading the row"
+    return bool(reader().q("SELECT 1 FROM blog WHERE url_slug=? LIMIT 1", [slug]))
 
+def add_blog_view(slug:str):
+    # Buffered and flushed in batches by `view_counter`; callers check `blog_exists` first
+    view_counter.add(slug)
+
+# Keyset pagination: pages are ordered by (created_at, id) and a cursor is the last row's pair
+PAGE_SIZE, MAX_PAGE_SIZE = 9, 48
+
+def encode_cursor(row): return f"{row.created_at}_{row.id}"
+
+def decode_cursor(cursor):
+    try:
+        created_at, id = cursor.rsplit('_', 1)
+        return created_at, int(id)
+    except (AttributeError, ValueError): return None
+
+def _keyset_page(tbl, where, where_args, cursor, limit):
+    limit = max(1, min(int(limit or PAGE_SIZE), MAX_PAGE_SIZE))
+    if (key := decode_cursor(cursor)):
+        where = f"{where} AND (created_at, id) < (?, ?)" if where else "(created_at, id) < (?, ?)"
+        where_args = [*where_args, *key]
+    rows = tbl(where=where, where_args=where_args or None, order_by="created_at DESC, id DESC", limit=limit+1)
+    return rows[:limit], (encode_cursor(rows[limit-1]) if len(rows) > limit else None)
+
+def _split_tags(rows): return sorted({t.strip() for o in rows for t in (o['tags'] or '').split(',') if t.strip()})
+
+@timed
+def get_blog_posts_page(cursor=None, limit=PAGE_SIZE):
+    "Published posts, newest first, returning `(posts, next_cursor)`"
+    posts, nxt = _keyset_page(reader().t.blog, "published=?", [True], cursor, limit)
+    return [view_counter.merge(o) for o in posts], nxt
+
+@timed
+def get_projects_page(cursor=None, limit=PAGE_SIZE):
+    "Projects, newest first, returning `(projects, next_cursor)`"
+    return _keyset_page(reader().t.project, None, [], cursor, limit)
+
+@timed
+def get_blog_tags(): return _split_tags(reader().q("SELECT DISTINCT tags FROM blog WHERE published=?", [True]))
+@timed
+def get_project_tags(): return _split_tags(reader().q("SELECT DISTINCT tags FROM project"))
+@timed
+def get_project_statuses(): return sorted(o['status'] for o in reader().q("SELECT DISTINCT status FROM project") if o['status'])
+
+@timed
+def search_blog_posts(text, limit=MAX_PAGE_SIZE):
+    return [view_counter.merge(Blog(**o)) for o in search(reader(), 'blog', text, "blog.published=?", [True], limit)]
+
+@timed
+def search_projects(text, limit=MAX_PAGE_SIZE):
+    return [Project(**o) for o in search(reader(), 'project', text, limit=limit)]
+
+@timed
+def search_contact_requests(text, limit=MAX_PAGE_SIZE):
+    return [Contact(**o) for o in search(reader(), 'contact', text, "contact.deleted=?", [False], limit)]
+
+@timed
 def homepage_blogposts():
-    blogposts = db.t.blog
-    return blogposts(where="published=?", where_args=(True,))
+    blogposts = reader().t.blog
+    return [view_counter.merge(o) for o in blogposts(where="published=?", where_args=(True,))]
+
+def restore_database(upload, filename=''):
+    "Replace the live database with an uploaded backup; returns the restored row counts"
+    counts = restore(pool, upload, filename)
+    user_cache.clear()
+    page_cache.invalidate()
+    return counts
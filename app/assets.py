@@ -0,0 +1,169 @@
+"""Self-hosted, fingerprinted front-end assets
+
+    python -m app.assets    # vendor the CDN files, prune the CSS, hash everything into static/dist/
+
+Until the build has run, `asset_headers` serves the original CDN and inline headers.
+"""
+import hashlib, json, logging, os, re, shutil, subprocess
+from pathlib import Path
+from urllib.request import Request, urlopen
+import monsterui
+from fasthtml.common import Link, Meta, Script, def_hdrs
+from monsterui.all import Theme
+
+log = logging.getLogger(__name__)
+SRC_DIR, DIST_DIR = Path("static/src"), Path("static/dist")
+MANIFEST = DIST_DIR/"manifest.json"
+# Files scanned for class names; the vendored JS is scanned too since it adds classes at runtime (uk-open, uk-active, ...)
+CLASS_SOURCES = ["main.py", "app/*.py", str(Path(monsterui.__file__).parent/"*.py")]
+
+def site_headers():
+    "Every page's `<head>` as CDN links and inline scripts: FastHTML defaults, the MonsterUI theme, Tailwind config, site theme"
+    # Code is highlighted on the server (app.highlight), so no highlight.js; posts with code link its stylesheet themselves
+    hdrs = [*def_hdrs(), *Theme.blue.headers(highlightjs=False)]
+    # After the Tailwind CDN script, which reads `tailwind.config` as it compiles
+    tw = next(i for i,h in enumerate(hdrs) if h.attrs.get('src', '').startswith('https://cdn.tailwindcss.com'))
+    hdrs.insert(tw+1, Script((SRC_DIR/"tailwind.config.js").read_text()))
+    return [*hdrs, Script((SRC_DIR/"theme.js").read_text())]
+
+def headers_digest(hdrs):
+    "Hash of the CDN URLs and inline sources, to spot a manifest built from older ones"
+    return hashlib.sha256(''.join(map(str, hdrs)).encode()).hexdigest()[:16]
+
+def fetch(url):
+    with urlopen(Request(url, headers={'User-Agent': 'erikg-personal-site'}), timeout=30) as r: return r.read()
+
+def fingerprint(data, name):
+    "Write `data` to static/dist/ as `{stem}.{hash}{suffix}` and return its URL"
+    stem, suffix = os.path.splitext(name)
+    out = DIST_DIR/f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{suffix}"
+    if not out.exists(): out.write_bytes(data)
+    return f"/{out.as_posix()}"
+
+def asset_name(url):
+    "Readable file name for a CDN URL, e.g. `franken-ui-core.min.css`"
+    host, _, path = url.split('://', 1)[1].split('?')[0].partition('/')
+    if not path: return host.split('.')[-2] + '.js'
+    path = re.sub(r'^(npm|gh)/', '', path)
+    pkg, base = re.split(r'[@/]', path)[0], path.rsplit('/', 1)[-1]
+    return base if base.startswith(pkg) else f"{pkg}-{base}"
+
+# CSS pruning: keep a rule if any of its selectors only needs classes that appear somewhere in the sources
+def used_classes(texts):
+    return {t for text in texts for t in re.findall(r'[\w-]+(?::[\w-]+)*', text)} | \
+           {t for text in texts for t in re.findall(r'[\w-]+', text)}
+
+def selector_classes(sel):
+    # Functional pseudo-classes (:not, :is, :where, :has) only narrow a match, so their classes aren't required
+    sel = re.sub(r':(not|is|where|has)\((?:[^()]|\([^()]*\))*\)', '', sel)
+    return [c.replace('\\', '') for c in re.findall(r'\.((?:\\.|[\w-])+)', sel)]
+
+def split_blocks(css):
+    "Top-level `(prelude, body)` pairs of `css`; `body` is None for statements like `@import ...;`"
+    out, i, n = [], 0, len(css)
+    while i < n:
+        j, depth, quote = i, 0, None
+        while j < n:
+            c = css[j]
+            if quote:
+                if c == '\\': j += 1
+                elif c == quote: quote = None
+            elif css.startswith('/*', j): j = css.find('*/', j+2) + 1 or n
+            elif c in '"\'': quote = c
+            elif c == ';' and depth == 0: break
+            elif c == '{':
+                if depth == 0: start = j
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0: break
+            j += 1
+        chunk = css[i:j+1].strip()
+        if chunk.endswith('}') and '{' in chunk:
+            out.append((css[i:start].strip(), css[start+1:j]))
+        elif chunk.strip(';').strip(): out.append((chunk.rstrip(';').strip(), None))
+        i = j + 1
+    return out
+
+def prune_css(css, used):
+    "Drop every rule none of whose selectors can match markup built from the `used` class names"
+    out = []
+    for prelude, body in split_blocks(re.sub(r'/\*.*?\*/', '', css, flags=re.S)):
+        if body is None: out.append(prelude + ';')
+        elif prelude.startswith(('@media', '@supports', '@layer', '@container')):
+            if inner := prune_css(body, used): out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'): out.append(f"{prelude}{{{body}}}")
+        else:
+            sels = [s for s in prelude.split(',') if all(c in used for c in selector_classes(s))]
+            if sels: out.append(f"{','.join(sels)}{{{body}}}")
+    return ''.join(out)
+
+def tailwind_css(used_files):
+    "Compile Tailwind ahead of time with its standalone CLI if installed; None means keep the in-browser JIT compiler"
+    if not (cli := shutil.which("tailwindcss")): return None
+    cfg = DIST_DIR/"tailwind.config.cjs"
+    cfg.write_text("module.exports = " + (SRC_DIR/"tailwind.config.js").read_text().split('=', 1)[1].rstrip().rstrip(';')
+                   .replace("theme:", f"content: {json.dumps(used_files)},\n    theme:", 1) + ";\n")
+    src = DIST_DIR/"tailwind.in.css"
+    src.write_text("@tailwind base;\n@tailwind components;\n@tailwind utilities;\n")
+    try: return subprocess.run([cli, "-c", str(cfg), "-i", str(src), "--minify"], check=True, capture_output=True).stdout
+    finally: cfg.unlink(), src.unlink()
+
+def build(fetch=fetch):
+    "Vendor, prune and fingerprint every header asset, then write the manifest `asset_headers` reads"
+    DIST_DIR.mkdir(parents=True, exist_ok=True)
+    hdrs, vendored = site_headers(), {}
+    for h in hdrs:
+        if url := h.attrs.get('src') or (h.attrs.get('href') if h.tag == 'link' else None): vendored[url] = fetch(url)
+    files = sorted({str(p) for g in CLASS_SOURCES for p in (Path(g).parent.glob(Path(g).name))})
+    used = used_classes([Path(f).read_text() for f in files] + [str(o) for o in hdrs] +
+                        [v.decode(errors='ignore') for u,v in vendored.items()
+                         if not u.endswith('.css') and not u.startswith('https://cdn.tailwindcss.com')])
+    compiled_tw = tailwind_css(files)
+    out, preload, sizes = [], [], {}
+    for i, h in enumerate(hdrs):
+        attrs = dict(h.attrs)
+        if h.tag == 'script' and attrs.get('src', '').startswith('https://cdn.tailwindcss.com') and compiled_tw is not None:
+            attrs = dict(rel='stylesheet', href=fingerprint(compiled_tw, 'tailwind.min.css'))
+            out.append(('link', attrs)); preload.append(('style', attrs['href']))
+            continue
+        if h.tag == 'script' and 'src' not in attrs and 'tailwind.config' in str(h.children) and compiled_tw is not None: continue
+        if h.tag == 'script':
+            data = vendored[attrs['src']] if 'src' in attrs else str(h.children[0]).encode()
+            attrs['src'] = fingerprint(data, asset_name(attrs['src']) if 'src' in h.attrs else f"inline-{i}.js")
+            preload.append(('modulepreload' if attrs.get('type') == 'module' else 'script', attrs['src']))
+        elif h.tag == 'link' and attrs.get('rel') == 'stylesheet':
+            data = vendored[attrs['href']]
+            pruned = prune_css(data.decode(), used).encode()
+            sizes[asset_name(attrs['href'])] = (len(data), len(pruned))
+            attrs['href'] = fingerprint(pruned, asset_name(attrs['href']))
+            preload.append(('style', attrs['href']))
+        elif h.tag == 'style':
+            attrs = dict(rel='stylesheet', href=fingerprint(str(h.children[0]).encode(), f"inline-{i}.css"))
+            out.append(('link', attrs)); preload.append(('style', attrs['href']))
+            continue
+        out.append((h.tag, attrs))
+    MANIFEST.write_text(json.dumps(dict(digest=headers_digest(hdrs), headers=out, preload=preload), indent=1))
+    from app.compress import precompress_static
+    list(precompress_static(DIST_DIR))
+    return out, sizes
+
+TAGS = dict(script=Script, link=Link, meta=Meta)
+
+def asset_headers():
+    "Fingerprinted local headers with preload hints when the build is current, else the CDN originals"
+    hdrs = site_headers()
+    try: manifest = json.loads(MANIFEST.read_text())
+    except (OSError, ValueError): return hdrs
+    if manifest['digest'] != headers_digest(hdrs):
+        log.warning("static/dist was built from older headers; serving the CDN ones until `python -m app.assets` is re-run")
+        return hdrs
+    # Preloads first, so every fetch starts before the parser blocks on the first synchronous script
+    preload = [Link(rel='modulepreload', href=href) if kind == 'modulepreload' else Link(rel='preload', href=href, **{'as': kind})
+               for kind, href in manifest['preload']]
+    return [*preload, *[TAGS[tag](**attrs) for tag, attrs in manifest['headers']]]
+
+if __name__ == "__main__":
+    headers, sizes = build()
+    for name, (before, after) in sizes.items(): print(f"{name}: {before//1024} KB -> {after//1024} KB")
+    print(f"{len(headers)} headers written to {MANIFEST}")
@@ -0,0 +1,132 @@
+import gzip, os, shutil, tempfile, threading, time, uuid, zlib
+from datetime import datetime
+from pathlib import Path
+import apsw
+from app.db import SCHEMA
+from app.migrations import duplicate_slugs
+
+try: import zstandard
+except ImportError: zstandard = None
+
+CHUNK_SIZE = 256 * 1024
+ENCODINGS = {'': '', 'gzip': '.gz', **({'zstd': '.zst'} if zstandard else {})}
+
+def private_dir(dir, setting):
+    "`dir`, unless it sits under the working directory, where the static route would serve its .gz/.sqlite files to anyone"
+    if dir is not None and Path(dir).resolve().is_relative_to(Path.cwd().resolve()):
+        raise ValueError(f"{setting}={dir} is inside the site root {os.getcwd()}, so backups there could be downloaded; "
+                         "use a directory outside it")
+    return dir
+
+class BackupJob:
+    "One snapshot in progress or ready to download"
+    def __init__(self, dest):
+        self.id, self.dest = uuid.uuid4().hex, dest
+        self.status, self.error = 'running', None
+        self.pages = self.remaining = 0
+        self.size, self.started, self.finished = None, time.time(), None
+        self.name = f"personal_site-{datetime.now():%Y%m%d-%H%M%S}.sqlite"
+
+    @property
+    def progress(self): return 1.0 if self.status == 'done' else (1 - self.remaining/self.pages if self.pages else 0.0)
+
+class Backups:
+    "Point-in-time copies of the live database, made page by page on a background thread with SQLite's online backup API"
+    def __init__(self, path, dir=None, pages_per_step=256, ttl=3600):
+        self.path, self.dir, self.pages_per_step, self.ttl = path, private_dir(dir, "BACKUP_DIR"), pages_per_step, ttl
+        self.jobs, self.lock = {}, threading.Lock()
+
+    def start(self):
+        self.purge()
+        fd, dest = tempfile.mkstemp(prefix="backup-", suffix=".sqlite", dir=self.dir)
+        os.close(fd)
+        job = BackupJob(dest)
+        with self.lock: self.jobs[job.id] = job
+        threading.Thread(target=self._run, args=(job,), name=f"backup-{job.id[:8]}", daemon=True).start()
+        return job
+
+    def _run(self, job):
+        try:
+            # A separate read-only connection: the copy never takes the pool's write lock, and in WAL mode
+            # holding one read transaction pins a snapshot, so concurrent writes neither tear nor restart it
+            src = apsw.Connection(self.path, flags=apsw.SQLITE_OPEN_READONLY)
+            dest = apsw.Connection(job.dest)
+            try:
+                src.execute("BEGIN")
+                src.execute("SELECT count(*) FROM sqlite_master").fetchall()
+                with dest.backup("main", src, "main") as b:
+                    while not b.done:
+                        b.step(self.pages_per_step)
+                        job.pages, job.remaining = b.page_count, b.remaining
+                src.execute("COMMIT")
+                # A single self-contained file, with no -wal/-shm sidecars to ship alongside it
+                dest.execute("PRAGMA journal_mode=DELETE")
+            finally: dest.close(), src.close()
+            job.size, job.status = os.path.getsize(job.dest), 'done'
+        except Exception as e:
+            job.status, job.error = 'failed', str(e)
+        job.finished = time.time()
+
+    def get(self, id): return self.jobs.get(id)
+
+    def stream(self, job, encoding=''):
+        "The snapshot in `CHUNK_SIZE` pieces, optionally gzip or zstd compressed on the fly"
+        enc = zlib.compressobj(6, zlib.DEFLATED, 31) if encoding == 'gzip' else \
+              zstandard.ZstdCompressor(level=3).compressobj() if encoding == 'zstd' else None
+        with open(job.dest, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                if enc is None: yield chunk
+                elif out := enc.compress(chunk): yield out
+        if enc is not None: yield enc.flush()
+
+    def purge(self):
+        "Forget jobs older than `ttl` and delete their files"
+        now = time.time()
+        with self.lock:
+            old = [j for j in self.jobs.values() if j.finished and now - j.finished > self.ttl]
+            for j in old: del self.jobs[j.id]
+        for j in old:
+            try: os.remove(j.dest)
+            except OSError: pass
+
+    def stats(self):
+        return dict(jobs=len(self.jobs), running=sum(j.status == 'running' for j in self.jobs.values()))
+
+def decompressed(f, filename):
+    "Readable file object over an upload, decompressing `.gz`/`.zst` backups as it's read"
+    if filename.endswith('.gz'): return gzip.GzipFile(fileobj=f, mode='rb')
+    if filename.endswith('.zst'):
+        if zstandard is None: raise ValueError("zstd backups need the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    return f
+
+def validate_database(path):
+    """Reasons `path` can't be restored: not SQLite, failing `integrity_check`, missing the app's tables and columns, or
+    blog posts sharing a slug (which the unique slug index can't take)"""
+    with open(path, 'rb') as f:
+        if f.read(16) != b'SQLite format 3\x00': return ["not a SQLite database"]
+    con = apsw.Connection(path)
+    try:
+        # Standalone file from here on, so no -wal/-shm of the live database can ever pair with it
+        con.execute("PRAGMA journal_mode=DELETE")
+        problems = [f"integrity_check: {o[0]}" for o in con.execute("PRAGMA integrity_check") if o[0] != 'ok'][:5]
+        for tbl, cls in SCHEMA.items():
+            cols = {o[1] for o in con.execute(f"PRAGMA table_info([{tbl}])")}
+            if not cols: problems.append(f"missing table {tbl}")
+            elif missing := set(cls.__annotations__) - cols: problems.append(f"{tbl} is missing {', '.join(sorted(missing))}")
+        if 'url_slug' in {o[1] for o in con.execute("PRAGMA table_info(blog)")} and (dupes := duplicate_slugs(con)):
+            problems.append(f"blog url_slugs used more than once: {', '.join(map(str, dupes[:5]))}")
+        return problems
+    finally: con.close()
+
+def restore(pool, upload, filename=''):
+    "Stream `upload` to a temp file beside the database, validate it, then copy it over the live one with `pool.replace`"
+    fd, tmp = tempfile.mkstemp(prefix=".restore-", suffix=".sqlite", dir=os.path.dirname(os.path.abspath(pool.path)))
+    try:
+        with os.fdopen(fd, 'wb') as out: shutil.copyfileobj(decompressed(upload, filename), out, CHUNK_SIZE)
+        if problems := validate_database(tmp): raise ValueError("; ".join(problems))
+        pool.replace(tmp)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    db = pool.reader()
+    return {tbl: db.execute(f"SELECT count(*) FROM [{tbl}]").fetchone()[0] for tbl in SCHEMA}
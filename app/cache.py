@@ -0,0 +1,162 @@
+import hashlib, os, threading, time
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from fasthtml.common import FtResponse, HTMLResponse, Response
+from starlette.datastructures import Headers, MutableHeaders
+from app.timing import timer
+
+def code_version():
+    "Changes whenever the app's code does, so validators never outlive a deploy; set BUILD_ID to pin it across hosts"
+    if build := os.getenv("BUILD_ID"): return build
+    root = Path(__file__).parent.parent
+    return hashlib.sha1(repr([(p.name, p.stat().st_mtime_ns) for p in [root/'main.py', *sorted(root.glob('app/*.py'))]
+                              if p.exists()]).encode()).hexdigest()[:12]
+
+CODE_VERSION = code_version()
+
+def http_date(iso):
+    "RFC 7231 date for a local-time ISO timestamp, as stored in `updated_at`"
+    return formatdate(datetime.fromisoformat(iso).timestamp(), usegmt=True) if iso else None
+
+def etag_base(tag):
+    "The representation-independent part of an ETag: no `W/`, and no `-br`/`-gzip` suffix from `CompressMiddleware`"
+    tag = tag.strip().removeprefix('W/')
+    for enc in ('br', 'gzip'):
+        if tag.endswith(f'-{enc}"'): return tag[:-len(enc)-2] + '"'
+    return tag
+
+def not_modified(headers, etag=None, last_modified=None):
+    """Whether a request's `If-None-Match` (weak comparison, any encoding) or, failing that, `If-Modified-Since` matches
+    the validators; `*` is only meaningful for writes, so on these GETs it never matches"""
+    if (inm := headers.get('if-none-match')) is not None:
+        return etag is not None and etag_base(etag) in {etag_base(t) for t in inm.split(',')}
+    if (ims := headers.get('if-modified-since')) and last_modified:
+        try: return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(ims)
+        except (TypeError, ValueError): return False
+    return False
+
+def request_kind(headers):
+    "'page' for a full document, 'partial' for a boosted navigation that only swaps #content, else 'fragment'"
+    if 'hx-request' not in headers or 'hx-history-restore-request' in headers: return 'page'
+    return 'partial' if headers.get('hx-target') == 'content' else 'fragment'
+
+class TTLCache:
+    "Thread-safe LRU mapping with at most `maxsize` entries that expire after `ttl` seconds (never if `ttl` is None)"
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize, self.ttl = maxsize, ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or (self.ttl is not None and item[1] < time.monotonic()):
+                if item is not None: del self.data[key]
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize: self.data.popitem(last=False)
+        return value
+
+    def pop(self, key):
+        with self.lock: item = self.data.pop(key, None)
+        return item[0] if item else None
+
+    def clear(self):
+        with self.lock: self.data.clear()
+
+    def __len__(self): return len(self.data)
+
+    def stats(self): return dict(size=len(self.data), maxsize=self.maxsize, ttl=self.ttl, hits=self.hits, misses=self.misses)
+
+class PageCache:
+    "Rendered-HTML cache keyed by route, arguments and auth identity; `invalidate` bumps `version` and drops every page"
+    def __init__(self, maxsize=256, ttl=None, enabled=True, stamp=None):
+        self.pages = TTLCache(maxsize, ttl)
+        self.enabled, self.version, self.stamp = enabled, 0, stamp
+        self.lock = threading.Lock()
+        self.not_modified = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+            self.pages.clear()
+
+    def key(self, req, route, *args, auth=None):
+        # Full documents, boosted #content partials and other HTMX fragments are different bodies, so cached separately
+        return (self.version, route, args, auth, request_kind(req.headers))
+
+    def validators(self, req, route, *args, auth=None):
+        "ETag, Last-Modified and Cache-Control for a page, from the content `stamp` alone, without rendering it"
+        if self.stamp is None: return {}
+        version, modified = self.stamp()
+        ident = (CODE_VERSION, version, *self.key(req, route, *args, auth=auth)[1:])
+        return {'ETag': f'"{hashlib.sha1(repr(ident).encode()).hexdigest()[:20]}"', 'Last-Modified': http_date(modified),
+                'Cache-Control': 'private, no-cache' if auth else 'public, no-cache', 'Vary': 'HX-Request, HX-Target'}
+
+    def cached(self, req, render, route, *args, auth=None):
+        "Serve `route` from the cache, or call `render` and cache its HTML; non-FT responses (e.g. redirects) pass through"
+        validators = {k:v for k,v in self.validators(req, route, *args, auth=auth).items() if v}
+        if validators and not_modified(req.headers, validators.get('ETag'), validators.get('Last-Modified')):
+            self.not_modified += 1
+            return Response(status_code=304, headers=validators)
+        key = self.key(req, route, *args, auth=auth) if self.enabled else None
+        if key and (hit := self.pages.get(key)) is not None:
+            body, headers = hit
+            return HTMLResponse(body, headers={**headers, **validators, 'x-cache': 'HIT'})
+        with timer('build'): res = render()
+        if isinstance(res, Response): return res
+        with timer('render'): res = FtResponse(res).__response__(req)
+        headers = {k:v for k,v in res.headers.items() if k not in ('content-length', 'content-type')}
+        if key and key[0] == self.version: self.pages.set(key, (res.body, headers))
+        res.headers.update({**validators, 'x-cache': 'MISS' if key else 'BYPASS'})
+        return res
+
+    def stats(self): return dict(self.pages.stats(), enabled=self.enabled, version=self.version, not_modified=self.not_modified)
+
+# Cache-Control by path prefix, for responses that don't set their own; pages get theirs from `PageCache.validators`
+CACHE_POLICIES = [
+    ('/static/dist/', 'public, max-age=31536000, immutable'),
+    ('/static/', 'public, max-age=86400'),
+    ('/admin', 'no-store'),
+    ('/search/contacts', 'no-store'), ('/metrics', 'no-store'),
+    ('/login', 'no-store'), ('/logout', 'no-store'), ('/redirect', 'no-store'),
+]
+
+class ConditionalMiddleware:
+    "ASGI middleware: applies `CACHE_POLICIES`, and turns a 200 whose validators match the request into a bodiless 304"
+    def __init__(self, app, policies=CACHE_POLICIES):
+        self.app, self.policies = app, policies
+        self.not_modified = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http': return await self.app(scope, receive, send)
+        req_headers = Headers(scope=scope)
+        policy = next((v for prefix, v in self.policies if scope['path'].startswith(prefix)), None)
+        conditional = scope['method'] in ('GET', 'HEAD') and ('if-none-match' in req_headers or 'if-modified-since' in req_headers)
+        skip = False
+        async def send_conditional(msg):
+            nonlocal skip
+            if msg['type'] == 'http.response.start':
+                hdrs = MutableHeaders(raw=msg['headers'])
+                if policy and 'cache-control' not in hdrs: hdrs['Cache-Control'] = policy
+                if conditional and msg['status'] == 200 and not_modified(req_headers, hdrs.get('etag'), hdrs.get('last-modified')):
+                    self.not_modified, skip = self.not_modified + 1, True
+                    for h in ('content-length', 'content-type', 'content-encoding'): del hdrs[h]
+                    msg = {**msg, 'status': 304}
+                    await send(msg)
+                    return await send({'type': 'http.response.body', 'body': b''})
+            elif skip: return
+            await send(msg)
+        await self.app(scope, receive, send_conditional)
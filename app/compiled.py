@@ -0,0 +1,57 @@
+"""FT components compiled to HTML templates: render once with placeholders, then fill in each row's escaped values
+
+Templates are rendered without indentation, so a card's HTML doesn't depend on how deep it sits in the page: filling
+one gives exactly the bytes `to_xml(tree, indent=False)` would, and inside an indented page it only drops the
+whitespace `to_xml` puts around block tags, which HTML ignores.
+"""
+import re
+from fastcore.xml import FT, Safe, _escape, _to_attr, to_xml
+
+TEXT, RAW = '\x00', '\x01'
+SLOTS = re.compile(r'([\w:.-]+)="\x00(\w+)\x00"|\x00(\w+)\x00|\x01(\w+)\x01')
+
+class Raw(FT):
+    "Pre-rendered inline HTML that sits in an FT tree as one child node, so it renders like the FT it replaces"
+    def __init__(self, html): super().__init__('', (Safe(html),), {}, void_=True)
+
+def compile_template(html):
+    "`html` split into literal strings and `(kind, field, attr)` slots, where kind is 'attr', 'text' or 'raw'"
+    parts, pos = [], 0
+    for m in SLOTS.finditer(html):
+        attr, field, text, raw = m.groups()
+        if text and html.rfind('<', 0, m.start()) > html.rfind('>', 0, m.start()):
+            raise ValueError(f"{text!r} is only part of an attribute value; pass the whole value as the field")
+        parts += [html[pos:m.start()], ('attr', field, attr) if attr else ('text', text, None) if text else ('raw', raw, None)]
+        pos = m.end()
+    return [*parts, html[pos:]]
+
+def fill(parts, fields):
+    return ''.join(p if p.__class__ is str else _to_attr(p[2], fields[p[1]]) if p[0] == 'attr' else
+                   fields[p[1]] if p[0] == 'raw' else f'{_escape(fields[p[1]])}' for p in parts)
+
+class Compiled:
+    """`build(**fields)` compiled to a template; fields named in `variant`, and any passed as None or `()`, select a
+    template, `Raw` fields are pasted in as-is, and the rest are escaped into text or whole attribute values"""
+    def __init__(self, build, variant=()):
+        self.build, self.variant = build, set(variant)
+        self.templates = {}
+
+    def fixed(self, k, v): return k in self.variant or v is None or v == ()
+
+    def template(self, kw):
+        key = tuple((k, v) if self.fixed(k, v) else k for k, v in kw.items())
+        if (parts := self.templates.get(key)) is None:
+            filled = [k for k, v in kw.items() if not self.fixed(k, v)]
+            holders = {**kw, **{k: Raw(RAW+k+RAW) if isinstance(kw[k], Raw) else TEXT+k+TEXT for k in filled}}
+            parts = compile_template(to_xml(self.build(**holders), indent=False))
+            if missing := set(filled) - {p[1] for p in parts if p.__class__ is not str}:
+                raise ValueError(f"{self.build.__name__} doesn't place {sorted(missing)} verbatim, so they can't be filled in")
+            self.templates[key] = parts
+        return parts
+
+    def html(self, **kw):
+        return fill(self.template(kw), {k: v.children[0] if isinstance(v, Raw) else v for k, v in kw.items()})
+
+    def __call__(self, **kw): return Raw(self.html(**kw))
+
+    def stats(self): return dict(templates=len(self.templates))
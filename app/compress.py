@@ -0,0 +1,151 @@
+"""Brotli/gzip response compression, plus precompressed `.br`/`.gz` siblings for static files
+
+    python -m app.compress    # write the siblings for everything under static/
+"""
+import hashlib, mimetypes, os, zlib
+from pathlib import Path
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from app.cache import TTLCache
+
+try: import brotli
+except ImportError: brotli = None
+
+COMPRESSIBLE = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+SUFFIX = {'br': '.br', 'gzip': '.gz'}
+
+def negotiate(accept, encodings=ENCODINGS):
+    "The first of `encodings` that an `Accept-Encoding` header allows (q > 0), or None"
+    prefs = {}
+    for part in accept.split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()[2:] if params.strip().startswith('q=') else '1'
+        try: prefs[name.strip().lower()] = float(q)
+        except ValueError: pass
+    return next((e for e in encodings if prefs.get(e, prefs.get('*', 0)) > 0), None)
+
+class Encoder:
+    "Incremental brotli/gzip encoder; `chunk` flushes so streamed HTML reaches the browser as it is produced"
+    def __init__(self, encoding, level=None):
+        self.br = encoding == 'br'
+        if self.br: self.c = brotli.Compressor(quality=5 if level is None else level)
+        else: self.c = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if self.br: return self.c.process(data) + self.c.flush()
+        return self.c.compress(data) + self.c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b''):
+        if self.br: return self.c.process(data) + self.c.finish()
+        return self.c.compress(data) + self.c.flush()
+
+def compress(data, encoding, level=None): return Encoder(encoding, level).finish(data)
+
+def encoded_etag(etag, encoding):
+    "A strong tag of its own for each encoding's bytes: `-br`/`-gzip` inside the quotes, which `not_modified` strips again"
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+def compressible(content_type):
+    return content_type.split(';')[0].strip().lower().startswith(COMPRESSIBLE)
+
+class CompressMiddleware:
+    "ASGI middleware: precompressed static siblings when present, else on-the-fly brotli/gzip above `min_size` bytes"
+    def __init__(self, app, min_size=500, static_dir="static", cache_size=256):
+        self.app, self.min_size, self.static_dir = app, min_size, Path(static_dir)
+        # Compressed copies of page-cached bodies, keyed by (encoding, body hash)
+        self.cache = TTLCache(cache_size)
+        self.compressed = self.bytes_in = self.bytes_out = self.static_hits = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http': return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding and scope['method'] in ('GET', 'HEAD') and (res := self.precompressed(scope['path'], encoding)):
+            self.static_hits += 1
+            return await res(scope, receive, send)
+        await Responder(self, encoding)(scope, receive, send)
+
+    def precompressed(self, path, encoding):
+        "`FileResponse` for the fresh `.br`/`.gz` sibling of a static file, if the build step wrote one"
+        if not path.startswith(f"/{self.static_dir.name}/") or '..' in path: return None
+        src = self.static_dir.parent / path.lstrip('/')
+        sib = src.with_name(src.name + SUFFIX[encoding])
+        try:
+            if sib.stat().st_mtime < src.stat().st_mtime: return None
+        except OSError: return None
+        media_type = mimetypes.guess_type(src.name)[0] or 'application/octet-stream'
+        return FileResponse(sib, media_type=media_type, headers={'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
+
+    def stats(self):
+        return dict(compressed=self.compressed, bytes_in=self.bytes_in, bytes_out=self.bytes_out,
+                    static_hits=self.static_hits, cache=self.cache.stats())
+
+class Responder:
+    "Holds back `http.response.start` until the first body chunk decides whether and how to compress"
+    def __init__(self, mw, encoding): self.mw, self.encoding, self.start, self.stream = mw, encoding, None, None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.mw.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, msg):
+        if msg['type'] == 'http.response.start':
+            hdrs = Headers(raw=msg['headers'])
+            if 'content-encoding' in hdrs or msg['status'] in (204, 206, 304) or not compressible(hdrs.get('content-type', '')):
+                return await self.send(msg)
+            MutableHeaders(raw=msg['headers']).add_vary_header('Accept-Encoding')
+            if not self.encoding: return await self.send(msg)
+            self.start = msg
+            return
+        if self.start is None or msg['type'] != 'http.response.body': return await self.send(msg)
+        body, more = msg.get('body', b''), msg.get('more_body', False)
+        if self.stream is None:
+            hdrs = MutableHeaders(raw=self.start['headers'])
+            if not more and len(body) < self.mw.min_size:
+                self.start, start = None, self.start
+                await self.send(start)
+                return await self.send(msg)
+            hdrs['Content-Encoding'] = self.encoding
+            if etag := hdrs.get('etag'): hdrs['ETag'] = encoded_etag(etag, self.encoding)
+            if more:
+                # Streaming body: compress chunk by chunk, length unknown up front
+                self.stream = Encoder(self.encoding)
+                del hdrs['Content-Length']
+            else:
+                body = self.whole(body, cacheable='x-cache' in hdrs)
+                hdrs['Content-Length'] = str(len(body))
+                await self.send(self.start)
+                return await self.send({**msg, 'body': body})
+            await self.send(self.start)
+        self.mw.bytes_in += len(body)
+        out = self.stream.chunk(body) if more else self.stream.finish(body)
+        self.mw.bytes_out += len(out)
+        if not more: self.mw.compressed += 1
+        await self.send({**msg, 'body': out})
+
+    def whole(self, body, cacheable=False):
+        key = (self.encoding, hashlib.blake2b(body, digest_size=16).digest()) if cacheable else None
+        if key and (out := self.mw.cache.get(key)) is not None: return out
+        out = compress(body, self.encoding)
+        self.mw.compressed, self.mw.bytes_in, self.mw.bytes_out = self.mw.compressed+1, self.mw.bytes_in+len(body), self.mw.bytes_out+len(out)
+        return self.mw.cache.set(key, out) if key else out
+
+def precompress_static(root="static", min_saving=0.1):
+    "Write `.br`/`.gz` siblings for files under `root` where that saves at least `min_saving`; yields (path, encoding, size, compressed size)"
+    for src in sorted(Path(root).rglob('*')):
+        if not src.is_file() or src.suffix in ('.br', '.gz', '.tmp'): continue
+        data = src.read_bytes()
+        for encoding in ENCODINGS:
+            sib = src.with_name(src.name + SUFFIX[encoding])
+            out = compress(data, encoding, level=11 if encoding == 'br' else 9)
+            if len(out) > len(data) * (1 - min_saving):
+                sib.unlink(missing_ok=True)
+                continue
+            tmp = sib.with_name(sib.name + '.tmp')
+            tmp.write_bytes(out)
+            os.replace(tmp, sib)
+            yield src, encoding, len(data), len(out)
+
+if __name__ == "__main__":
+    for src, encoding, n, m in precompress_static():
+        print(f"{src} {encoding:>5}: {n//1024} KB -> {m//1024} KB")
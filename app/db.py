@@ -1,4 +1,23 @@
+import os, threading, time
+import apsw
+from contextlib import contextmanager
+from dataclasses import field, make_dataclass
+from apswutils.db import COLUMN_TYPE_MAPPING, column_affinity
+from fastcore.xtras import UNSET, flexiclass
 from fastlite import *
+from app.migrations import migrate
+from app.timing import trace_connection
+from app.metrics import metrics
+
+DB_PATH = "personal_site.sqlite"
+
+# Applied to every connection; override any of them with e.g. SQLITE_PRAGMAS="synchronous=full,mmap_size=0"
+PRAGMAS = dict(journal_mode='wal', synchronous='normal', cache_size=-16000, mmap_size=128*1024*1024,
+               temp_store='memory', busy_timeout=5000)
+
+def pragma_profile(overrides=None):
+    env = dict(o.split('=', 1) for o in os.getenv("SQLITE_PRAGMAS", "").split(',') if '=' in o)
+    return {**PRAGMAS, **{k.strip():v.strip() for k,v in env.items()}, **(overrides or {})}
 
 class User: github_id: int; username: str; display_name: str; email: str; \
                 avatar_url: str; bio: str; created_at: str; last_login: str; is_admin: bool
@@ -40,9 +59,108 @@ class Contact:
     response_date: str
     deleted: bool
 
+# Every table and the columns it has at least; restored backups are checked against it too
+SCHEMA = dict(user=User, contact=Contact, project=Project, blog=Blog)
+
+def schema_dataclass(name):
+    "The dataclass `db.t[name].dataclass()` would make, built from the schema class instead, so without a connection"
+    return flexiclass(make_dataclass(name.title(), [(k, column_affinity(COLUMN_TYPE_MAPPING[t]) | None, field(default=UNSET))
+                                                    for k, t in SCHEMA[name].__annotations__.items()]))
+
+# SQLite's own busy_timeout backoff, in ms
+BUSY_DELAYS = (1, 2, 5, 10, 15, 20, 25, 25, 25, 50, 50, 100)
+
+def busy_handler(timeout_ms):
+    "Stand-in for `busy_timeout` that sleeps the same way, but counts every retry and every timeout"
+    def handler(n):
+        waited = sum(BUSY_DELAYS[:n]) + max(0, n - len(BUSY_DELAYS)) * BUSY_DELAYS[-1]
+        if waited >= timeout_ms:
+            metrics.inc('sqlite_busy_timeouts_total')
+            return False
+        metrics.inc('sqlite_busy_retries_total')
+        time.sleep(min(BUSY_DELAYS[min(n, len(BUSY_DELAYS)-1)], timeout_ms - waited) / 1000)
+        return True
+    return handler
+
+def connect(path=DB_PATH, pragmas=None):
+    "Open `path` with the pragma profile applied"
+    db = database(path, wal=False)
+    profile = pragma_profile(pragmas)
+    for k,v in profile.items(): db.execute(f"PRAGMA {k}={v}")
+    # Replaces the busy_timeout just set, keeping its value
+    db.conn.set_busy_handler(busy_handler(int(profile.get('busy_timeout', 0))))
+    trace_connection(db.conn)
+    return db
+
+class ConnectionPool:
+    "One connection per reading thread plus a single writer connection that callers take turns on"
+    def __init__(self, path=DB_PATH, pragmas=None):
+        self.path, self.pragmas = path, pragmas
+        # Opened by `open()`: from the app's startup hook, or on first use by anything running without one
+        self.writer = None
+        self.write_lock, self.open_lock, self.local, self.classes = threading.Lock(), threading.Lock(), threading.local(), {}
+        self.readers, self.writes, self.write_wait, self.max_write_wait = 0, 0, 0.0, 0.0
+        self.generation = 0
+
+    def open(self):
+        "Open the writer, creating and migrating the schema first if needed"
+        if self.writer is None:
+            with self.open_lock:
+                if self.writer is None: self.writer = self._open_writer()
+        return self.writer
+
+    def _open_writer(self):
+        db = get_database(self.path, self.pragmas)
+        for name, cls in self.classes.items(): db.t[name].cls = cls
+        return db
+
+    def dataclass(self, name):
+        "Create the dataclass for table `name`, and have every connection return rows as it"
+        self.classes[name] = schema_dataclass(name)
+        return self.classes[name]
+
+    def reader(self):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            self.open()
+            db = self.local.db = connect(self.path, self.pragmas)
+            for name, cls in self.classes.items(): db.t[name].cls = cls
+            self.readers += 1
+        return db
+
+    @contextmanager
+    def write(self):
+        "Hold the writer connection exclusively, recording how long we waited for it"
+        self.open()
+        start = time.perf_counter()
+        with self.write_lock:
+            wait = time.perf_counter() - start
+            self.writes, self.write_wait, self.max_write_wait = self.writes+1, self.write_wait+wait, max(self.max_write_wait, wait)
+            yield self.writer
+
+    def replace(self, path):
+        """Overwrite the database with the one at `path` through SQLite's backup API, holding the write lock; every open
+        connection, in this worker or any other, stays valid and simply sees the new contents"""
+        self.open()
+        with self.write_lock:
+            src = apsw.Connection(path)
+            try:
+                # A WAL database can't change its page size, so make the copy's match before copying it in
+                page_size = self.writer.execute("PRAGMA page_size").fetchone()[0]
+                if src.execute("PRAGMA page_size").fetchone()[0] != page_size:
+                    src.execute(f"PRAGMA page_size={page_size}")
+                    src.execute("VACUUM")
+                with self.writer.conn.backup("main", src, "main") as b: b.step()
+            finally: src.close()
+            migrate(self.writer)
+            self.generation += 1
+
+    def stats(self):
+        return dict(readers=self.readers, generation=self.generation, writes=self.writes, write_wait_total=self.write_wait,
+                    write_wait_avg=self.write_wait/self.writes if self.writes else 0.0, write_wait_max=self.max_write_wait)
 
-def get_database():
-    db = database("personal_site.sqlite")
+def get_database(path=DB_PATH, pragmas=None):
+    db = connect(path, pragmas)
     users = db['users']
     contacts = db['contacts']
     projects = db['projects']
@@ -51,4 +169,5 @@ def get_database():
     if contacts not in db.tables:db.create(Contact, pk='id')
     if projects not in db.tables:db.create(Project, pk='id')
     if blogs not in db.tables:db.create(Blog, pk='id')
+    migrate(db)
     return db
@@ -0,0 +1,94 @@
+import json, logging, os, threading, time
+from concurrent.futures import Future
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from app.metrics import metrics
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+log = logging.getLogger(__name__)
+
+class GitHubStats:
+    "Per-user GitHub stats backed by a SQLite TTL cache, revalidated with ETags, with one fetch in flight per user"
+    def __init__(self, pool, api_url=GITHUB_API_URL, ttl=600, timeout=5):
+        self.pool, self.api_url, self.ttl, self.timeout = pool, api_url.rstrip('/'), ttl, timeout
+        self.lock, self.inflight = threading.Lock(), {}
+        self.calls = self.not_modified = self.hits = self.coalesced = self.stale = 0
+        self.rate_remaining = None
+
+    def _cached(self, path):
+        res = self.pool.reader().q("SELECT etag, body, fetched_at FROM github_cache WHERE path=?", [path])
+        return res[0] if res else None
+
+    def _store(self, path, etag, body):
+        with self.pool.write() as db:
+            db.execute("INSERT OR REPLACE INTO github_cache (path, etag, body, fetched_at) VALUES (?, ?, ?, ?)",
+                       [path, etag, body, time.time()])
+
+    def _get(self, path, token=None):
+        "GET `path` as JSON, from the cache while fresh and with `If-None-Match` once stale"
+        cached = self._cached(path)
+        if cached and time.time() - cached['fetched_at'] < self.ttl:
+            self.hits += 1
+            return json.loads(cached['body'])
+        hdrs = {'Accept': 'application/vnd.github+json', 'User-Agent': 'erikg-personal-site'}
+        if token: hdrs['Authorization'] = f"Bearer {token}"
+        if cached and cached['etag']: hdrs['If-None-Match'] = cached['etag']
+        self.calls += 1
+        try:
+            with urlopen(Request(self.api_url + path, headers=hdrs), timeout=self.timeout) as r:
+                self._rate(r.headers)
+                body, etag = r.read().decode(), r.headers.get('ETag')
+            metrics.inc('github_api_calls_total', status=r.status)
+        except HTTPError as e:
+            metrics.inc('github_api_calls_total', status=e.code)
+            self._rate(e.headers)
+            if e.code != 304 or not cached: return self._stale(path, cached, e)
+            # Not modified: doesn't count against the rate limit, just restart the TTL
+            self.not_modified += 1
+            body, etag = cached['body'], cached['etag']
+        except OSError as e:
+            metrics.inc('github_api_calls_total', status='error')
+            return self._stale(path, cached, e)
+        self._store(path, etag, body)
+        return json.loads(body)
+
+    def _stale(self, path, cached, err):
+        "The expired cached body when GitHub is down or refusing us, rather than no stats at all"
+        if not cached: raise err
+        log.warning("GitHub %s failed (%s); serving the copy from %.0fs ago", path, err, time.time() - cached['fetched_at'])
+        self.stale += 1
+        return json.loads(cached['body'])
+
+    def _rate(self, headers):
+        if headers and (remaining := headers.get('X-RateLimit-Remaining')) is not None: self.rate_remaining = int(remaining)
+
+    def _fetch(self, username, token=None):
+        user = self._get(f"/users/{username}", token)
+        repos = self._get(f"/users/{username}/repos?per_page=5", token)
+        langs = {}
+        for repo in repos[:5]:
+            if repo.get('language'): langs[repo['language']] = langs.get(repo['language'], 0) + 1
+        return {
+            'repos': user['public_repos'],
+            'followers': user['followers'],
+            'following': user['following'],
+            'created_at': user['created_at'][:10],
+            'top_languages': sorted(langs.items(), key=lambda x: x[1], reverse=True)[:3]
+        }
+
+    def get(self, username, token=None):
+        "Stats for `username`; concurrent callers for the same user share a single fetch"
+        with self.lock:
+            fut, leader = self.inflight.get(username), False
+            if fut is None: fut, leader = self.inflight.setdefault(username, Future()), True
+            else: self.coalesced += 1
+        if not leader: return fut.result(timeout=self.timeout*3)
+        try: fut.set_result(self._fetch(username, token))
+        except Exception as e: fut.set_exception(e)
+        finally:
+            with self.lock: self.inflight.pop(username, None)
+        return fut.result()
+
+    def stats(self):
+        return dict(calls=self.calls, not_modified=self.not_modified, cache_hits=self.hits, coalesced=self.coalesced, stale=self.stale,
+                    rate_remaining=self.rate_remaining, ttl=self.ttl)
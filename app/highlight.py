@@ -0,0 +1,43 @@
+"""Server-side syntax highlighting with Pygments, memoized by (language, source hash)"""
+import functools, hashlib, html, importlib.util
+from fasthtml.common import Link
+from app.cache import TTLCache
+
+# Pygments itself is imported on first use, keeping it off the boot path
+HAVE_PYGMENTS = importlib.util.find_spec("pygments") is not None
+
+# (light, dark) Pygments styles, switched by the `dark` class the site theme toggles on <html>
+HIGHLIGHT_STYLES = ('xcode', 'one-dark')
+highlighted = TTLCache(maxsize=1024)
+
+def highlight(source, language=None):
+    "Highlighted HTML (token spans, no wrapper) for `source`; escaped plain text for unknown languages or without Pygments"
+    key = (language, hashlib.sha256(source.encode()).hexdigest())
+    if (out := highlighted.get(key)) is not None: return out
+    if not HAVE_PYGMENTS or not language: return highlighted.set(key, html.escape(source))
+    from pygments import highlight as pygmentize
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+    try: lexer = get_lexer_by_name(language, stripnl=False)
+    except ClassNotFound: lexer = None
+    out = pygmentize(source, lexer, HtmlFormatter(nowrap=True)) if lexer else html.escape(source)
+    return highlighted.set(key, out)
+
+@functools.cache
+def highlight_css():
+    "One stylesheet with both themes, scoped under `.highlight` so only highlighted blocks pick it up"
+    if not HAVE_PYGMENTS: return ""
+    from pygments.formatters import HtmlFormatter
+    light, dark = HIGHLIGHT_STYLES
+    return (HtmlFormatter(style=light).get_style_defs('html:not(.dark) .highlight') + "\n" +
+            HtmlFormatter(style=dark).get_style_defs('html.dark .highlight'))
+
+@functools.cache
+def highlight_css_url():
+    "Where `highlight_css` is served, fingerprinted so browsers can keep it for good"
+    return f"/highlight/{hashlib.sha256(highlight_css().encode()).hexdigest()[:10]}"
+
+def HighlightStyles():
+    "Stylesheet link for pages that show highlighted code; only those pay for it"
+    return Link(rel="stylesheet", href=highlight_css_url()) if HAVE_PYGMENTS else None
@@ -0,0 +1,128 @@
+"""Width-bucketed, recompressed variants of local images, stored content-addressed and served immutable
+
+    python -m app.images    # pre-build every variant for static/
+"""
+import hashlib, importlib.util, os, re, threading
+from functools import cache
+from pathlib import Path, PurePosixPath
+from fasthtml.common import FileResponse, Img, Picture, Response, Source
+
+# Pillow is imported where it's used, on the first card or variant, rather than while the app boots
+HAVE_PILLOW = importlib.util.find_spec("PIL") is not None
+
+IMAGE_CACHE_DIR = Path(os.getenv("IMAGE_CACHE_DIR", ".image_cache"))
+IMAGE_WIDTHS = (32, 64, 128, 256, 384, 512, 768, 1024, 1536)
+IMAGE_EXTS = {'.png', '.jpg', '.jpeg', '.webp'}
+MIME = {'avif': 'image/avif', 'webp': 'image/webp', 'png': 'image/png', 'jpg': 'image/jpeg'}
+SAVE_OPTS = {'avif': dict(format='AVIF', quality=55), 'webp': dict(format='WEBP', quality=80, method=4),
+             'png': dict(format='PNG', optimize=True), 'jpg': dict(format='JPEG', quality=82, optimize=True, progressive=True)}
+IMMUTABLE = {'Cache-Control': 'public, max-age=31536000, immutable'}
+
+@cache
+def modern_formats():
+    "Formats worth a `<source>`, best first, limited to what this Pillow build can encode"
+    if not HAVE_PILLOW: return ()
+    from PIL import features
+    return tuple(f for f in ('avif', 'webp') if features.check(f))
+
+class ImageVariants:
+    "Maps local source images to `/img/{digest}/{fmt}/{width}` URLs and renders those variants on first request"
+    def __init__(self, root="static", cache_dir=IMAGE_CACHE_DIR):
+        self.root, self.cache_dir = Path(root), Path(cache_dir)
+        self.sources, self.info = {}, {}
+        self.lock = threading.Lock()
+        self.built = self.served = 0
+
+    def local_path(self, src):
+        "Path under `root` for a site-relative `src` (`static/x.png`, `/static/x.png`, `../static/x.png`), else None"
+        if not src or '://' in src or src.startswith('data:'): return None
+        parts = list(PurePosixPath(src).parts)
+        # Site-relative, so the leading `/` and any `../` hops of a relative link all lead to the site root
+        while parts and parts[0] in ('/', '..'): parts.pop(0)
+        if parts[:1] != [self.root.name] or PurePosixPath(src).suffix.lower() not in IMAGE_EXTS: return None
+        path = self.root.parent.joinpath(*parts)
+        # `static/../..` and symlinks out of `root` resolve elsewhere
+        if not path.resolve().is_relative_to(self.root.resolve()): return None
+        return path if path.is_file() else None
+
+    def inspect(self, path):
+        "`(digest, width)` of `path`, recomputed only when its size or mtime changes"
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        if (info := self.info.get(key)) is None:
+            from PIL import Image
+            with Image.open(path) as im: info = hashlib.sha256(path.read_bytes()).hexdigest()[:16], im.width
+            with self.lock: self.info[key], self.sources[info[0]] = info, path
+        return info
+
+    def source(self, digest):
+        if digest not in self.sources:
+            for p in self.root.rglob('*'):
+                if p.suffix.lower() in IMAGE_EXTS: self.inspect(p)
+        return self.sources.get(digest)
+
+    def variant(self, digest, width, fmt):
+        "Path of the `width`px `fmt` variant of the source with `digest`, building it if needed; None if unknown"
+        if width not in IMAGE_WIDTHS or fmt not in SAVE_OPTS or not HAVE_PILLOW: return None
+        out = self.cache_dir / digest / f"{width}.{fmt}"
+        if out.exists(): return out
+        if (src := self.source(digest)) is None: return None
+        from PIL import Image
+        with Image.open(src) as im:
+            im = im.convert('RGBA' if fmt != 'jpg' and im.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            if width < im.width: im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+            im.save(tmp, **SAVE_OPTS[fmt])
+        os.replace(tmp, out)
+        self.built += 1
+        return out
+
+    def response(self, digest, fmt, width):
+        out = self.variant(digest, width, fmt) if re.fullmatch(r'[0-9a-f]{16}', digest) else None
+        if out is None: return Response(status_code=404)
+        self.served += 1
+        return FileResponse(out, media_type=MIME[fmt], headers=IMMUTABLE)
+
+    def widths(self, src_w, width):
+        "Buckets up to 2x the rendered `width`, capped at the source's own width"
+        ws = [w for w in IMAGE_WIDTHS if w <= min(2 * width, src_w)]
+        return ws or [min(IMAGE_WIDTHS)]
+
+    def srcset(self, digest, widths, fmt):
+        # No file extension in the URL, or FastHTML's static-file route would claim it
+        return ", ".join(f"/img/{digest}/{fmt}/{w} {w}w" for w in widths)
+
+    def build(self):
+        "Pre-build every variant under `root` so no visitor pays for a resize"
+        for p in sorted(self.root.rglob('*')):
+            if p.suffix.lower() not in IMAGE_EXTS: continue
+            (d, src_w), fallback = self.inspect(p), fallback_format(p)
+            for w in self.widths(src_w, max(IMAGE_WIDTHS)):
+                for fmt in (*modern_formats(), fallback): yield p, w, self.variant(d, w, fmt)
+
+    def stats(self):
+        return dict(sources=len(self.sources), built=self.built, served=self.served, formats=modern_formats())
+
+def fallback_format(path): return 'png' if path.suffix.lower() == '.png' else 'jpg'
+
+image_variants = ImageVariants()
+
+def ResponsiveImg(src, alt="", width=None, height=None, sizes=None, lazy=True, cls=(), **kwargs):
+    "`<picture>` with AVIF/WebP `srcset`s for local images, a plain `Img` otherwise; always sized and lazy by default"
+    attrs = dict(alt=alt, width=width, height=height, loading="lazy" if lazy else None, decoding="async", cls=cls, **kwargs)
+    path = image_variants.local_path(src) if HAVE_PILLOW and width else None
+    if path is None: return Img(src=src, **attrs)
+    (digest, src_w), fallback = image_variants.inspect(path), fallback_format(path)
+    widths = image_variants.widths(src_w, width)
+    sizes = sizes or f"{width}px"
+    sources = [Source(type=MIME[f], srcset=image_variants.srcset(digest, widths, f), sizes=sizes) for f in modern_formats()]
+    img = Img(src=f"/img/{digest}/{fallback}/{widths[-1]}", srcset=image_variants.srcset(digest, widths, fallback), sizes=sizes, **attrs)
+    return Picture(*sources, img)
+
+if __name__ == "__main__":
+    total = 0
+    for src, w, out in image_variants.build():
+        total += 1
+        print(f"{src} {w:>5}w -> {out} ({out.stat().st_size//1024} KB)")
+    print(f"{total} variants in {image_variants.cache_dir}")
@@ -0,0 +1,182 @@
+"""In-process counters and histograms, merged across workers and served in the Prometheus text format
+
+Each worker snapshots its own metrics to METRICS_DIR every METRICS_INTERVAL seconds (and whenever it serves a
+scrape); `/metrics` adds up the snapshots of every live worker, so it answers for the whole server whichever
+worker gets the request. Gauges stay per worker, labelled with its pid.
+"""
+import json, logging, os, tempfile, threading, time
+from bisect import bisect_left
+from pathlib import Path
+
+METRICS_DIR = Path(os.getenv("METRICS_DIR", Path(tempfile.gettempdir())/"personal-site-metrics"))
+log = logging.getLogger(__name__)
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+def _key(labels): return tuple(sorted(labels.items()))
+
+class Metrics:
+    "Thread-safe counters, histograms and gauge sources for one worker"
+    def __init__(self, dir=METRICS_DIR, interval=5.0):
+        self.dir, self.interval, self.pid = Path(dir), interval, os.getpid()
+        self.counters, self.histograms, self.help = {}, {}, {}
+        self.sources = []  # (prefix, stats function) read into gauges at snapshot time
+        self.lock = threading.Lock()
+        self._stop, self._thread = threading.Event(), None
+
+    def describe(self, name, text): self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[_key(labels)] = series.get(_key(labels), 0) + value
+
+    def observe(self, name, value, **labels):
+        "Add `value` (seconds) to histogram `name`"
+        with self.lock:
+            counts, total = self.histograms.setdefault(name, {}).setdefault(_key(labels), [[0] * (len(BUCKETS) + 1), 0.0])
+            counts[bisect_left(BUCKETS, value)] += 1
+            self.histograms[name][_key(labels)][1] = total + value
+
+    def source(self, prefix, stats):
+        "Report every number in `stats()` as a gauge named `{prefix}_{key}`"
+        self.sources.append((prefix, stats))
+
+    def gauges(self):
+        out = {'process_resident_memory_bytes': rss()}
+        for prefix, stats in self.sources:
+            try: out.update(flatten(prefix, stats()))
+            except Exception: pass
+        return out
+
+    def snapshot(self):
+        with self.lock:
+            counters = {n: [[list(k), v] for k, v in s.items()] for n, s in self.counters.items()}
+            histograms = {n: [[list(k), c[:], t] for k, (c, t) in s.items()] for n, s in self.histograms.items()}
+        return dict(pid=self.pid, time=time.time(), counters=counters, histograms=histograms, gauges=self.gauges(), help=self.help)
+
+    def write(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        out = self.dir/f"{self.pid}.json"
+        tmp = out.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, out)
+
+    def workers(self):
+        "Snapshots of every live worker, deleting those of workers that have exited"
+        self.write()
+        snaps = []
+        for p in self.dir.glob('*.json'):
+            try: snap = json.loads(p.read_text())
+            except (OSError, ValueError): continue
+            if not alive(snap['pid']):
+                p.unlink(missing_ok=True)
+                continue
+            snaps.append(snap)
+        return snaps
+
+    def render(self):
+        "Every worker's metrics, merged, in the Prometheus text exposition format"
+        snaps, lines = self.workers(), []
+        help = {k: v for s in snaps for k, v in s['help'].items()}
+        def header(name, kind):
+            if name in help: lines.append(f"# HELP {name} {help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        counters, histograms = {}, {}
+        for s in snaps:
+            for name, series in s['counters'].items():
+                for k, v in series:
+                    key = tuple(map(tuple, k))
+                    counters.setdefault(name, {})[key] = counters.get(name, {}).get(key, 0) + v
+            for name, series in s['histograms'].items():
+                for k, c, t in series:
+                    h = histograms.setdefault(name, {}).setdefault(tuple(map(tuple, k)), [[0] * len(c), 0.0])
+                    h[0], h[1] = [a + b for a, b in zip(h[0], c)], h[1] + t
+        for name, series in sorted(counters.items()):
+            header(name, 'counter')
+            lines += [f"{name}{fmt_labels(k)} {v}" for k, v in sorted(series.items())]
+        for name, series in sorted(histograms.items()):
+            header(name, 'histogram')
+            for k, (counts, total) in sorted(series.items()):
+                cum = 0
+                for le, n in zip([*map(str, BUCKETS), '+Inf'], counts):
+                    cum += n
+                    lines.append(f"{name}_bucket{fmt_labels(k, le=le)} {cum}")
+                lines += [f"{name}_sum{fmt_labels(k)} {total}", f"{name}_count{fmt_labels(k)} {cum}"]
+        for name in sorted({g for s in snaps for g in s['gauges']}):
+            header(name, 'gauge')
+            lines += [f"{name}{fmt_labels((), pid=s['pid'])} {s['gauges'][name]}" for s in snaps if name in s['gauges']]
+        return '\n'.join(lines) + '\n'
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try: self.write()
+            except Exception: log.exception("Metrics snapshot to %s failed", self.dir)
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        # Under a process manager this runs in each forked worker, so take the worker's pid, not the parent's
+        self.pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join()
+        (self.dir/f"{self.pid}.json").unlink(missing_ok=True)
+
+def fmt_labels(key, **extra):
+    labels = [*key, *extra.items()]
+    if not labels: return ''
+    esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in labels) + '}'
+
+def flatten(prefix, stats):
+    out = {}
+    for k, v in stats.items():
+        name = f"{prefix}_{k}"
+        if isinstance(v, dict): out.update(flatten(name, v))
+        elif isinstance(v, (int, float)): out[name] = float(v)
+    return out
+
+def alive(pid):
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: pass
+    return True
+
+def rss():
+    "Resident set size of this process in bytes"
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource, sys
+        # Peak rather than current where /proc is missing; macOS reports bytes, Linux KiB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+metrics = Metrics(interval=float(os.getenv("METRICS_INTERVAL", 5)))
+metrics.describe('http_requests_total', "Requests by route template, method and status")
+metrics.describe('http_request_duration_seconds', "Time to the end of the response body, by route template")
+metrics.describe('sqlite_busy_retries_total', "Times a connection found the database locked and waited to retry")
+metrics.describe('sqlite_busy_timeouts_total', "Times a connection gave up waiting for a lock (SQLITE_BUSY raised)")
+metrics.describe('db_rows_written_total', "Rows written, by table and operation")
+metrics.describe('github_api_calls_total', "Requests sent to the GitHub API, by response status")
+metrics.describe('process_resident_memory_bytes', "Resident set size of the worker")
+
+class MetricsMiddleware:
+    "ASGI middleware: request count and latency per route template (the matched route's path, never the raw URL)"
+    def __init__(self, app, metrics=metrics): self.app, self.metrics = app, metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http': return await self.app(scope, receive, send)
+        start, status = time.perf_counter(), 500
+        async def send_status(msg):
+            nonlocal status
+            if msg['type'] == 'http.response.start': status = msg['status']
+            await send(msg)
+        try: await self.app(scope, receive, send_status)
+        finally:
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            self.metrics.inc('http_requests_total', route=route, method=scope['method'], status=status)
+            self.metrics.observe('http_request_duration_seconds', time.perf_counter() - start, route=route)
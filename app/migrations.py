@@ -0,0 +1,69 @@
+import re
+from datetime import datetime
+from app.search import setup_search
+
+HOT_LOOKUP_INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS blog_url_slug ON blog(url_slug);
+CREATE INDEX IF NOT EXISTS blog_published_created ON blog(published, created_at, id);
+CREATE INDEX IF NOT EXISTS blog_published_tags ON blog(published, tags);
+CREATE INDEX IF NOT EXISTS project_created ON project(created_at, id);
+CREATE INDEX IF NOT EXISTS project_featured_created ON project(featured, created_at);
+CREATE INDEX IF NOT EXISTS project_tags ON project(tags);
+CREATE INDEX IF NOT EXISTS project_status ON project(status);
+CREATE INDEX IF NOT EXISTS contact_deleted_created ON contact(deleted, created_at);
+"""
+
+def duplicate_slugs(db):
+    "`url_slug`s shared by more than one blog post; works on a fastlite database or a bare connection"
+    return [o[0] for o in db.execute("SELECT url_slug FROM blog GROUP BY url_slug HAVING count(*) > 1 ORDER BY url_slug")]
+
+def index_hot_lookups(db):
+    # The unique slug index would fail with a bare constraint error; say which posts need a new slug instead
+    if dupes := duplicate_slugs(db):
+        raise ValueError(f"blog posts share these url_slugs, give each a unique one before migrating: {', '.join(map(str, dupes))}")
+    db.conn.execute(HOT_LOOKUP_INDEXES)
+
+# Append-only: each migration runs once, in order, and its number is recorded in `schema_version`
+MIGRATIONS = [
+    (1, "full-text search indexes", setup_search),
+    (2, "indexes for hot lookups", index_hot_lookups),
+    (3, "github api response cache", """
+CREATE TABLE IF NOT EXISTS github_cache (path TEXT PRIMARY KEY, etag TEXT, body TEXT, fetched_at REAL);
+"""),
+    (4, "content versions for conditional requests", """
+CREATE INDEX IF NOT EXISTS blog_updated ON blog(updated_at);
+CREATE INDEX IF NOT EXISTS project_updated ON project(updated_at);
+CREATE TABLE IF NOT EXISTS view_epoch (id INTEGER PRIMARY KEY CHECK (id = 1), epoch INTEGER NOT NULL, flushed_at TEXT);
+INSERT OR IGNORE INTO view_epoch VALUES (1, 0, NULL);
+"""),
+]
+
+def schema_version(db):
+    db.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, name TEXT, applied_at TEXT)")
+    return db.execute("SELECT coalesce(max(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(db, migrations=MIGRATIONS):
+    "Apply every migration newer than the recorded schema version, each in its own transaction"
+    current = schema_version(db)
+    for version, name, step in migrations:
+        if version <= current: continue
+        with db.conn:
+            if callable(step): step(db)
+            else: db.conn.execute(step)
+            db.execute("INSERT INTO schema_version VALUES (?, ?, ?)", [version, name, datetime.now().isoformat()])
+        db.execute("ANALYZE")
+    return schema_version(db)
+
+def query_plan(db, sql, params=None): return [o[3] for o in db.execute(f"EXPLAIN QUERY PLAN {sql}", params or [])]
+
+def query_plans(db, fn):
+    "Run `fn` and return `(sql, plan_details)` for every statement it issued"
+    stmts = []
+    with db.tracer(lambda sql, params: stmts.append((sql, params))): fn()
+    return [(sql, query_plan(db, sql, params)) for sql, params in stmts
+            if re.match(r'\s*(select|update|delete)\b', sql, re.I) and 'sqlite_master' not in sql]
+
+def unindexed(plans):
+    "Plans that scan a table without an index"
+    full_scan = re.compile(r'^SCAN (?!.*\b(INDEX|PRIMARY KEY|CONSTANT ROW)\b)')
+    return [(sql, plan) for sql, plan in plans if any(full_scan.match(o) for o in plan)]
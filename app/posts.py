@@ -0,0 +1,119 @@
+"""Markdown blog posts from blogposts/{slug}.md, rendered once per content hash and cached in memory and on disk
+
+    python -m app.posts    # pre-render every post
+"""
+import hashlib, html, json, os, re, threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import mistletoe
+from mistletoe import Document
+from monsterui.franken import apply_classes, get_franken_renderer
+from app.highlight import HAVE_PYGMENTS, highlight
+
+POSTS_DIR = Path(os.getenv("POSTS_DIR", "blogposts"))
+POST_CACHE_DIR = Path(os.getenv("POST_CACHE_DIR", ".post_cache"))
+# Part of every cache key: bump it whenever the rendered HTML would change for the same Markdown
+RENDER_VERSION = f"2-{mistletoe.__version__}-{HAVE_PYGMENTS}"
+
+@dataclass
+class RenderedPost:
+    html: str
+    headings: list  # [level, text, id] for every heading, in order
+    words: int
+
+    @property
+    def toc(self):
+        "`(text, id)` pairs for `TableOfContents`: the top heading level, plus the next one if the top is just a title"
+        levels = sorted({h[0] for h in self.headings})
+        if len(levels) > 1 and sum(h[0] == levels[0] for h in self.headings) > 1: levels = levels[:1]
+        return [(text, id) for level, text, id in self.headings if level in levels[:2]]
+
+    @property
+    def has_code(self): return '<pre class="highlight' in self.html
+
+def slugify(text): return re.sub(r'[^\w]+', '-', text.lower()).strip('-') or 'section'
+
+class PostRenderer(get_franken_renderer(None)):
+    "MonsterUI's Markdown renderer, plus heading ids (collected in `headings`) for the table of contents and highlighted code"
+    def __init__(self, *extras, **kwargs):
+        super().__init__(*extras, **kwargs)
+        self.headings, self.ids = [], set()
+
+    def render_heading(self, token):
+        inner = self.render_inner(token)
+        text = html.unescape(re.sub(r'<[^>]+>', '', inner))
+        id, n = slugify(text), 1
+        while id in self.ids: id, n = f"{slugify(text)}-{n+1}", n+1
+        self.ids.add(id)
+        self.headings.append([token.level, text, id])
+        return f'<h{token.level} id="{id}">{inner}</h{token.level}>'
+
+    def render_block_code(self, token):
+        attr = f' class="language-{html.escape(token.language)}"' if token.language else ''
+        return f'<pre class="highlight"><code{attr}>{highlight(token.content, token.language)}</code></pre>'
+
+def render(text):
+    with PostRenderer() as r: body = r.render(Document(text))
+    words = len(html.unescape(re.sub(r'<[^>]+>', ' ', body)).split())
+    return RenderedPost(apply_classes(body), r.headings, words)
+
+class Posts:
+    "Rendered posts by slug; the Markdown is only parsed when a file's content hash has no cached render"
+    def __init__(self, root=POSTS_DIR, cache_dir=POST_CACHE_DIR):
+        self.root, self.cache_dir = Path(root), Path(cache_dir)
+        self.digests, self.rendered = {}, {}
+        self.lock = threading.Lock()
+        self.hits = self.disk_hits = self.renders = 0
+
+    def path(self, slug):
+        if not re.fullmatch(r'[\w-]+', slug or ''): return None
+        path = self.root/f"{slug}.md"
+        return path if path.is_file() else None
+
+    def digest(self, path):
+        "Content hash of `path`, re-read only when its size or mtime changes"
+        st = path.stat()
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        if (digest := self.digests.get(key)) is None:
+            digest = hashlib.sha256(RENDER_VERSION.encode() + path.read_bytes()).hexdigest()[:16]
+            with self.lock: self.digests[key] = digest
+        return digest
+
+    def version(self, slug):
+        "Content hash of blogposts/{slug}.md, for page validators, or None if there is no such file"
+        return self.digest(path) if (path := self.path(slug)) else None
+
+    def get(self, slug):
+        "The `RenderedPost` for `slug`, or None if there is no blogposts/{slug}.md"
+        if (path := self.path(slug)) is None: return None
+        digest = self.digest(path)
+        if (post := self.rendered.get(digest)) is not None:
+            self.hits += 1
+            return post
+        out = self.cache_dir/f"{digest}.json"
+        try:
+            post = RenderedPost(**json.loads(out.read_text()))
+            self.disk_hits += 1
+        except (OSError, ValueError, TypeError):
+            post = render(path.read_text())
+            out.parent.mkdir(parents=True, exist_ok=True)
+            tmp = out.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(asdict(post)))
+            os.replace(tmp, out)
+            self.renders += 1
+        with self.lock: self.rendered[digest] = post
+        return post
+
+    def build(self):
+        "Render every post under `root` so no visitor pays for a parse"
+        for p in sorted(self.root.glob('*.md')): yield p, self.get(p.stem)
+
+    def stats(self):
+        return dict(posts=len(self.rendered), hits=self.hits, disk_hits=self.disk_hits, renders=self.renders)
+
+posts = Posts()
+
+if __name__ == "__main__":
+    for path, post in posts.build():
+        print(f"{path}: {post.words} words, {len(post.headings)} headings")
+    print(f"{len(posts.rendered)} posts in {posts.cache_dir}")
@@ -0,0 +1,46 @@
+import re
+
+# Full-text indexes kept in sync with their content tables by triggers: table -> (indexed columns, bm25 weights)
+SEARCH_INDEXES = {
+    'blog':    (('title', 'description', 'tags'), (10.0, 4.0, 2.0)),
+    'project': (('title', 'description', 'tags'), (10.0, 4.0, 2.0)),
+    'contact': (('name', 'email', 'message'),     (5.0, 5.0, 1.0)),
+}
+
+def _index_sql(tbl, cols):
+    fts, cs = f"{tbl}_fts", ', '.join(cols)
+    new, old = ', '.join(f"new.{c}" for c in cols), ', '.join(f"old.{c}" for c in cols)
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cs}, content='{tbl}', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+CREATE TRIGGER IF NOT EXISTS {tbl}_fts_ai AFTER INSERT ON {tbl} BEGIN
+    INSERT INTO {fts}(rowid, {cs}) VALUES (new.id, {new});
+END;
+CREATE TRIGGER IF NOT EXISTS {tbl}_fts_ad AFTER DELETE ON {tbl} BEGIN
+    INSERT INTO {fts}({fts}, rowid, {cs}) VALUES ('delete', old.id, {old});
+END;
+CREATE TRIGGER IF NOT EXISTS {tbl}_fts_au AFTER UPDATE OF {cs} ON {tbl} BEGIN
+    INSERT INTO {fts}({fts}, rowid, {cs}) VALUES ('delete', old.id, {old});
+    INSERT INTO {fts}(rowid, {cs}) VALUES (new.id, {new});
+END;"""
+
+def setup_search(db):
+    "Create any missing FTS5 indexes and sync triggers, backfilling new indexes from existing rows"
+    for tbl, (cols, _) in SEARCH_INDEXES.items():
+        new = f"{tbl}_fts" not in db.table_names()
+        with db.conn:
+            db.conn.execute(_index_sql(tbl, cols))
+            if new: db.execute(f"INSERT INTO {tbl}_fts({tbl}_fts) VALUES ('rebuild')")
+
+def fts_query(text):
+    "Turn free text into an FTS5 query that prefix-matches every word, so results update while typing"
+    return ' '.join(f'"{t}"*' for t in re.findall(r'\w+', text or ''))
+
+def search(db, tbl, text, where=None, where_args=(), limit=20):
+    "Rows of `tbl` matching `text`, best bm25 rank first"
+    if not (q := fts_query(text)): return []
+    _, weights = SEARCH_INDEXES[tbl]
+    fts = f"{tbl}_fts"
+    sql = f"""SELECT {tbl}.* FROM {fts} JOIN {tbl} ON {tbl}.id = {fts}.rowid
+              WHERE {fts} MATCH ? {f'AND {where}' if where else ''}
+              ORDER BY bm25({fts}, {', '.join(map(str, weights))}) LIMIT ?"""
+    return db.q(sql, [q, *where_args, limit])
@@ -0,0 +1,109 @@
+"""Per-request phase timings and SQL counts, sent as a `Server-Timing` header and logged as JSON lines
+
+Every request is logged at INFO; requests slower than SLOW_REQUEST_MS are logged at WARNING with every span and
+SQL statement. REQUEST_LOG_LEVEL=INFO logs them all (default WARNING); SERVER_TIMING=0 turns the layer off.
+"""
+import json, logging, os, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import apsw
+from starlette.datastructures import MutableHeaders
+
+ENABLED = os.getenv("SERVER_TIMING", "1") != "0"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))
+MAX_STATEMENTS = 100
+
+log = logging.getLogger("app.timing")
+if not log.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(os.getenv("REQUEST_LOG_LEVEL", "WARNING").upper())
+    log.propagate = False
+
+class RequestTimings:
+    "Spans and SQL statements of one request; shared (not copied) by every thread the request's context runs on"
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans, self.statements = [], []  # (name, offset ms, duration ms), (sql, rows)
+        self.queries = self.rows = 0
+        self.pending = {}  # rows counted so far per running statement
+
+    def phases(self):
+        "Total duration and count per span name, in first-seen order"
+        out = {}
+        for name, _, dur in self.spans:
+            total, n = out.get(name, (0.0, 0))
+            out[name] = (total + dur, n + 1)
+        return out
+
+    def header(self, total):
+        parts = [f'{name};dur={dur:.1f}' + (f';desc="x{n}"' if n > 1 else '') for name, (dur, n) in self.phases().items()]
+        parts.append(f'sql;desc="{self.queries} statements, {self.rows} rows"')
+        return ', '.join([*parts, f'total;dur={total:.1f}'])
+
+current = ContextVar('request_timings', default=None)
+
+@contextmanager
+def timer(name):
+    "Record the enclosed block as a `name` span of the current request, if there is one"
+    if (t := current.get()) is None:
+        yield
+        return
+    start = time.perf_counter()
+    try: yield
+    finally:
+        end = time.perf_counter()
+        t.spans.append((name, (start - t.start) * 1000, (end - start) * 1000))
+
+def timed(fn):
+    "Decorator: time each call of `fn` as a span named after it"
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if current.get() is None: return fn(*args, **kwargs)
+        with timer(fn.__name__): return fn(*args, **kwargs)
+    return wrapper
+
+def _trace(event):
+    if (t := current.get()) is None: return
+    if event['code'] == apsw.SQLITE_TRACE_ROW:
+        t.rows += 1
+        t.pending[event['id']] = t.pending.get(event['id'], 0) + 1
+    else:
+        t.queries += 1
+        rows = t.pending.pop(event['id'], 0)
+        if len(t.statements) < MAX_STATEMENTS: t.statements.append((' '.join(event['sql'].split()), rows))
+
+def trace_connection(conn):
+    "Count the statements and rows `conn` runs on behalf of the current request"
+    if ENABLED: conn.trace_v2(apsw.SQLITE_TRACE_PROFILE | apsw.SQLITE_TRACE_ROW, _trace)
+
+class TimingMiddleware:
+    "ASGI middleware: starts each request's `RequestTimings`, adds `Server-Timing`, then logs the breakdown"
+    def __init__(self, app, slow_ms=SLOW_REQUEST_MS): self.app, self.slow_ms = app, slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not ENABLED: return await self.app(scope, receive, send)
+        t, status = RequestTimings(), None
+        token = current.set(t)
+        async def send_timed(msg):
+            nonlocal status
+            if msg['type'] == 'http.response.start':
+                status = msg['status']
+                MutableHeaders(raw=msg['headers'])['Server-Timing'] = t.header((time.perf_counter() - t.start) * 1000)
+            await send(msg)
+        try: await self.app(scope, receive, send_timed)
+        finally:
+            current.reset(token)
+            self.log(scope, status, t)
+
+    def log(self, scope, status, t):
+        total = (time.perf_counter() - t.start) * 1000
+        slow = total >= self.slow_ms
+        if not log.isEnabledFor(logging.WARNING if slow else logging.INFO): return
+        record = dict(method=scope['method'], path=scope['path'], status=status, ms=round(total, 1), queries=t.queries, rows=t.rows,
+                      phases={k: dict(ms=round(d, 1), n=n) for k, (d, n) in t.phases().items()})
+        if slow:
+            record.update(slow=True, spans=[(name, round(at, 1), round(d, 1)) for name, at, d in sorted(t.spans, key=lambda o: o[1])], statements=t.statements)
+        log.log(logging.WARNING if slow else logging.INFO, json.dumps(record))
@@ -1,16 +1,26 @@
 from monsterui.all import *
 from fasthtml.common import *
 from fasthtml.svg import *
+import os, re
+from urllib.parse import urlencode
 from datetime import datetime
-from ghapi.all import *
 
 from app.api import *
+from app.images import ResponsiveImg
+from app.compiled import Compiled, Raw
+from app.highlight import HighlightStyles
+from app.posts import posts
+from app.backup import ENCODINGS as BACKUP_ENCODINGS
 from app.personal_blog import *
 
 URL = "https://erikgaasedelen.com"
+SITE_NAME = "Erik Gaasedelen"
+CARD_SIZES = "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+# Page links: HTMX fetches just the #content region of the target page, swaps it in and pushes the URL; see CommonScreen
+BOOST = dict(hx_boost="true", hx_target="#content", hx_swap="innerHTML show:window:top")
 
 def LoginButton():
-    return A(href="/login")(
+    return A(href="/login", **BOOST)(
         Button(cls=(ButtonT.ghost, "hover:bg-muted", "hover:text-primary","transition-colors duration-200", "border border-border/50", "rounded-full","min-w-[100px]"))(
             DivLAligned(UkIcon('log-in', height=16, width=16, cls="mr-2"),  "Sign In",  cls="px-4 py-2"),
         )
@@ -60,52 +70,6 @@ def ErikNavBar(user=None):
     sun_icon, moon_icon = UkIcon('sun', height=16, width=16), UkIcon('moon', height=16, width=16)
     icon_group = Div(cls="relative w-4 h-4")(Div(sun_icon, cls="absolute dark:hidden"), Div(moon_icon, cls="absolute hidden dark:block"))
 
-    theme_script = Script("""
-            // Check and apply theme on page load
-            function applyTheme() {
-                const html = document.documentElement;
-                const isDark = localStorage.theme === 'dark' || 
-                    (!('theme' in localStorage) && window.matchMedia('(prefers-color-scheme: dark)').matches);
-                
-                // Ensure uk-theme-blue is always present
-                if (!html.classList.contains('uk-theme-blue')) {
-                    html.classList.add('uk-theme-blue');
-                }
-                
-                // Handle dark/light theme
-                if (isDark) {
-                    html.classList.add('dark');
-                } else {
-                    html.classList.remove('dark');
-                }
-            }
-
-            // Apply theme immediately
-            applyTheme();
-
-            // Function to toggle theme
-            function toggleTheme() {
-                const html = document.documentElement;
-                if (html.classList.contains('dark')) {
-                    html.classList.remove('dark');
-                    localStorage.theme = 'light';
-                } else {
-                    html.classList.add('dark');
-                    localStorage.theme = 'dark';
-                }
-                // Ensure uk-theme-blue remains
-                if (!html.classList.contains('uk-theme-blue')) {
-                    html.classList.add('uk-theme-blue');
-                }
-            }
-
-            // Watch system theme changes
-            window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', e => {
-                if (!('theme' in localStorage)) {
-                    applyTheme();
-                }
-            });
-        """)
     theme_toggle = Button(cls=ButtonT.secondary, onclick="toggleTheme()")(icon_group)
 
     social_icons = DivHStacked(cls="space-x-4 hidden sm:flex")(
@@ -114,13 +78,13 @@ def ErikNavBar(user=None):
         UkIconLink('twitter', href="https://x.com/erikgaas", height=20),  
     )
 
-    nav_items = [Li(A("About", href="/")), Li(A("Projects", href="/projects")), Li(A("Blog", href="/blogposts")), Li(A("Contact"), uk_toggle="target: #contact-modal")]
+    nav_items = [Li(A("About", href="/", **BOOST)), Li(A("Projects", href="/projects", **BOOST)), Li(A("Blog", href="/blogposts", **BOOST)), Li(A("Contact"), uk_toggle="target: #contact-modal")]
     mobile_menu = Button(UkIcon('menu', height=24, width=24), cls=(ButtonT.ghost, "sm:hidden"), uk_toggle="target: #mobile-menu")
 
-    left_nav  = NavBarLSide(A(H3("Erik Gaasedelen", cls=TextT.primary + "mr-6"), href="/"), NavBarNav(*nav_items, cls="hidden sm:flex"))
+    left_nav  = NavBarLSide(A(H3("Erik Gaasedelen", cls=TextT.primary + "mr-6"), href="/", **BOOST), NavBarNav(*nav_items, cls="hidden sm:flex"))
     right_nav = NavBarRSide(social_icons, theme_toggle, login_btn, mobile_menu, cls="space-x-4")
 
-    return Div(theme_script, NavBarContainer(left_nav, right_nav, cls="border-b border-border px-4 py-2"), MobileMenu(nav_items))
+    return Div(NavBarContainer(left_nav, right_nav, cls="border-b border-border px-4 py-2"), MobileMenu(nav_items))
 
 
 def HeroSection():
@@ -137,7 +101,8 @@ def HeroSection():
     about = P("""Fullstack, Deep Learning, Autonomous Vehicles, Med Tech. Learn, build, teach. 🔁""", cls=TextT.muted + "text-center sm:text-left")
     contact = DivLAligned(UkIcon("mail", height=24, width=24, cls="mr-3"),"Get in touch", cls="px-4")
     contact_button = Button(uk_toggle="target: #contact-modal", cls=(ButtonT.primary, "py-3 w-full sm:w-auto sm:min-w-[180px] mt-3 sm:mt-0", "text-lg"))(contact)
-    erik_image = Img(src="static/github_profile.png", alt="Profile Picture", cls="rounded-full w-32 h-32 sm:w-48 sm:h-48 object-cover shadow-lg mx-auto sm:mx-0")
+    erik_image = ResponsiveImg("static/github_profile.png", alt="Profile Picture", width=192, height=192, sizes="(min-width: 640px) 192px, 128px", lazy=False,
+                               cls="rounded-full w-32 h-32 sm:w-48 sm:h-48 object-cover shadow-lg mx-auto sm:mx-0")
 
     profile_pic = Div(erik_image, cls="mb-6 sm:mb-0 sm:mr-8")
     footer_buttons = Div(social_buttons, contact_button, cls="flex flex-col sm:flex-row sm:justify-between items-center space-y-3 sm:space-y-0")
@@ -147,25 +112,39 @@ def HeroSection():
         Div(profile_pic, profile_info, cls="flex flex-col sm:flex-row items-center sm:items-start text-center sm:text-left"))
 
 
-def BlogCard(blog):
-    """Create a preview card for a single blog post"""
-    image_section = Div(cls="relative")(Img(src=blog.image_url, alt=blog.title, cls="object-cover w-full h-48"))
-    formated_created_date = datetime.strptime(blog.created_at, "%Y-%m-%dT%H:%M:%S.%f").strftime("%B %d, %Y")
-    published = DivHStacked(UkIcon("calendar", height=16, width=16), P(formated_created_date, cls=TextPresets.muted_sm), cls="space-x-2")
-    views = DivHStacked(UkIcon("eye", height=16, width=16), P(f"{blog.views} views", cls=TextPresets.muted_sm), cls="space-x-2")
+def CardImage(src, alt):
+    return ResponsiveImg(src, alt=alt, width=768, height=384, sizes=CARD_SIZES, cls="object-cover w-full h-48")
+
+def TagLabel(tag): return Label(tag, cls=LabelT.secondary)
+
+def card_tags(tags): return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+def BlogCardView(title, description, href, date, views, image, tags):
+    """Blog preview card from display values, shared by `BlogCard` and its compiled template"""
+    image_section = Div(cls="relative")(image)
+    published = DivHStacked(UkIcon("calendar", height=16, width=16), P(date, cls=TextPresets.muted_sm), cls="space-x-2")
+    views = DivHStacked(UkIcon("eye", height=16, width=16), P(views, cls=TextPresets.muted_sm), cls="space-x-2")
     metadata = DivLAligned(cls="space-x-4")(published, views)
-    title_section = Div(cls="space-y-2")(H3(blog.title, cls=TextT.bold), metadata)
-    description = P(blog.description, cls=TextPresets.muted_sm)
-    tags = Div(cls="flex flex-wrap gap-2")(*[Label(tag.strip(), cls=LabelT.secondary) for tag in blog.tags.split(',') if tag.strip()])
-    read_more = A(href=f"/blog/{blog.url_slug}", cls=(AT.muted, TextPresets.bold_sm))(
+    title_section = Div(cls="space-y-2")(H3(title, cls=TextT.bold), metadata)
+    description = P(description, cls=TextPresets.muted_sm)
+    tags = Div(cls="flex flex-wrap gap-2")(tags)
+    read_more = A(href=href, cls=(AT.muted, TextPresets.bold_sm), **BOOST)(
         DivLAligned("Read more", UkIcon("arrow-right", height=16, width=16, cls="ml-2"))
     )
     content_section = Div(title_section, description, tags, read_more, cls="space-y-4 p-6")
     return Card(image_section, content_section, cls=(CardT.hover + CardT.secondary, "max-w-sm"))
 
+def blog_card_fields(blog):
+    formated_created_date = datetime.strptime(blog.created_at, "%Y-%m-%dT%H:%M:%S.%f").strftime("%B %d, %Y")
+    return dict(title=blog.title, description=blog.description, href=f"/blog/{blog.url_slug}", date=formated_created_date, views=f"{blog.views} views")
+
+def BlogCard(blog):
+    """Create a preview card for a single blog post"""
+    return BlogCardView(**blog_card_fields(blog), image=CardImage(blog.image_url, blog.title), tags=tuple(map(TagLabel, card_tags(blog.tags))))
+
 def HomeSectionHeader(title, description, button_text, button_href):
     view_all_btn = A(DivLAligned(button_text, UkIcon("arrow-right", height=16, width=16), cls="px-4 py-2"),
-        href=button_href,
+        href=button_href, **BOOST,
         cls=(ButtonT.secondary, "hover:shadow-md", "transition-all duration-200", 
              "border border-border", "min-w-[160px]", "inline-flex")
     )
@@ -179,7 +158,7 @@ def HomeSectionHeader(title, description, button_text, button_href):
 def LatestBlogs(blogs):
     """Create a section displaying the latest blog posts"""
     header = HomeSectionHeader("Latest Posts", "Check out my latest thoughts and tutorials", "View all posts", "/blogposts")    
-    blog_grid = Div(cls="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mt-8 justify-items-center")(*[BlogCard(blog) for blog in blogs])
+    blog_grid = Div(cls="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mt-8 justify-items-center")(*map(GridBlogCard, blogs))
     return Section(header, blog_grid, cls="mt-16 mx-auto max-w-6xl px-4")
 
 # # Let's create some sample blog posts
@@ -283,35 +262,59 @@ def ContactModal():
         id="contact-modal"
     )
 
-def ProjectCard(project):
-    """Create a card for a single project"""
-    status_colors = {'in-progress': AlertT.warning, 'completed': AlertT.success, 'archived': AlertT.info}
-    image_section = Div( Img(src=project.image_url, alt=project.title, cls="object-cover w-full h-48"), cls="relative")
+PROJECT_STATUS_COLORS = {'in-progress': AlertT.warning, 'completed': AlertT.success, 'archived': AlertT.info}
+
+def ProjectCardView(title, description, status, status_cls, featured, github_url, project_url, image, tags):
+    """Project card from display values, shared by `ProjectCard` and its compiled template"""
+    image_section = Div(image, cls="relative")
     badges = Div(
-        Alert(project.status.title(), cls=(status_colors.get(project.status, AlertT.info), "text-sm")),
-        Label("Featured", cls=LabelT.secondary) if project.featured else None, cls="absolute top-4 right-4 space-y-2")
+        Alert(status, cls=(status_cls, "text-sm")),
+        Label("Featured", cls=LabelT.secondary) if featured else None, cls="absolute top-4 right-4 space-y-2")
     
     title_section = DivFullySpaced(
-        H3(project.title, cls=TextT.bold),
-        DivHStacked(UkIconLink("github", href=project.github_url, height=20),
-                    UkIconLink("link", href=project.project_url, height=20), cls="space-x-3"))
+        H3(title, cls=TextT.bold),
+        DivHStacked(UkIconLink("github", href=github_url, height=20),
+                    UkIconLink("link", href=project_url, height=20), cls="space-x-3"))
     
-    description = P(project.description, cls=TextPresets.muted_sm)
+    description = P(description, cls=TextPresets.muted_sm)
 
-    tags = Div(
-        *[Label(tag.strip(), cls=LabelT.secondary) for tag in project.tags.split(',') if tag.strip()],
-        cls="flex flex-wrap gap-2"
-    )
+    tags = Div(tags, cls="flex flex-wrap gap-2")
     
     return Card(image_section, badges, Div(title_section, description, tags, cls="space-y-4 p-6"),
                 cls=(CardT.hover + CardT.secondary, "max-w-sm"))
 
+def project_card_fields(project):
+    return dict(title=project.title, description=project.description, status=project.status.title(),
+                status_cls=PROJECT_STATUS_COLORS.get(project.status, AlertT.info), featured=bool(project.featured),
+                github_url=project.github_url, project_url=project.project_url)
+
+def ProjectCard(project):
+    """Create a card for a single project"""
+    return ProjectCardView(**project_card_fields(project), image=CardImage(project.image_url, project.title),
+                           tags=tuple(map(TagLabel, card_tags(project.tags))))
+
+# Card grids fill compiled templates of the views above instead of building ~25 FT nodes per row; the output is
+# byte-identical to them rendered unindented (see tests/test_compiled.py), and COMPILED_CARDS=0 goes back to building them
+COMPILED_CARDS = os.getenv("COMPILED_CARDS", "1") != "0"
+card_image, tag_label = Compiled(CardImage, variant=('src',)), Compiled(TagLabel)
+blog_card, project_card = Compiled(BlogCardView), Compiled(ProjectCardView, variant=('status_cls', 'featured'))
+
+def compiled_card_extras(row):
+    tags = card_tags(row.tags)
+    return dict(image=Raw(card_image.html(src=row.image_url, alt=row.title)), tags=Raw(''.join(tag_label.html(tag=t) for t in tags)) if tags else ())
+
+def GridBlogCard(blog):
+    return blog_card(**blog_card_fields(blog), **compiled_card_extras(blog)) if COMPILED_CARDS else BlogCard(blog)
+
+def GridProjectCard(project):
+    return project_card(**project_card_fields(project), **compiled_card_extras(project)) if COMPILED_CARDS else ProjectCard(project)
+
 def ProjectsSection(projects):
     """Create the projects section"""
     header = HomeSectionHeader("Featured Projects", "Some things I've built", "View all projects", "/projects")
     project_grid = Div(
         cls="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mt-8 justify-items-center"
-    )(*[ProjectCard(project) for project in projects])
+    )(*map(GridProjectCard, projects))
     
     return Section(header, project_grid, cls="mt-16 mx-auto max-w-6xl px-4")
 
@@ -358,13 +361,17 @@ def Footer():
     copyright = P(f"© {datetime.now().year} Erik Gaasedelen. All rights reserved.", cls=TextPresets.muted_sm)
     return Section(DivVStacked(DividerSplit(), DivCentered(social_icons, copyright, cls="space-y-4 py-8")), cls="mt-auto")
 
+def SearchInput(placeholder, href, target, cls="w-full sm:w-[300px] bg-secondary border-border text-secondary-foreground hover:bg-secondary/80 focus:bg-secondary/80"):
+    """Search box that swaps ranked results into `target` as you type"""
+    return Input(placeholder=placeholder, cls=cls, uk_icon="icon: search", type="search", name="q",
+                 hx_get=href, hx_trigger="input changed delay:300ms, search", hx_target=target, hx_swap="innerHTML")
+
+def NoResults(text="No results found."):
+    return Div(P(text, cls=TextPresets.muted_sm), cls="col-span-full text-center py-8")
+
 def BlogToolbar(tags, active_tag=None, sort_by="newest"):
     search_input = Div(
-        Input(
-            placeholder="Search posts...",
-            cls="w-full sm:w-[300px] bg-secondary border-border text-secondary-foreground hover:bg-secondary/80 focus:bg-secondary/80",
-            uk_icon="icon: search"
-        ),
+        SearchInput("Search posts...", "/search/blogs", "#blog-grid"),
         cls="flex-grow sm:flex-grow-0"
     )
     
@@ -383,9 +390,19 @@ def BlogToolbar(tags, active_tag=None, sort_by="newest"):
     return Div(DivFullySpaced(search_input, sort_dropdown, cls="flex-wrap gap-4"), tag_filters, cls="space-y-4 mb-8")
 
 
-def BlogPage(blogs, auth=None):
-    all_tags = set()
-    for blog in blogs: all_tags.update(tag.strip() for tag in blog.tags.split(','))
+def LoadMore(href):
+    """Infinite-scroll sentinel that swaps itself for the next page of grid items"""
+    button = Button(DivLAligned("Load more", UkIcon("chevron-down", height=16, width=16, cls="ml-2")), cls=ButtonT.secondary,
+                    hx_get=href, hx_trigger="click, intersect once", hx_target="this", hx_swap="outerHTML")
+    return Div(button, Loading(cls=(LoadingT.spinner + LoadingT.sm, "ml-2"), htmx_indicator=True),
+               cls="col-span-full flex justify-center items-center mt-4")
+
+def BlogGridItems(blogs, next_cursor=None):
+    """One page of blog cards, followed by a sentinel for the next page if there is one"""
+    return (*map(GridBlogCard, blogs), LoadMore(f"/blogposts/more?{urlencode(dict(cursor=next_cursor))}") if next_cursor else None)
+
+def BlogPage(blogs, auth=None, next_cursor=None, tags=None):
+    if tags is None: tags = sorted({tag.strip() for blog in blogs for tag in blog.tags.split(',')})
     
     header = DivFullySpaced(
         Div(
@@ -403,27 +420,14 @@ def BlogPage(blogs, auth=None):
         ) if auth and get_user(auth).is_admin else None
     )
     
-    toolbar = BlogToolbar(sorted(all_tags))
-    blog_grid = Div(cls="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mt-8 justify-items-center")(*[BlogCard(blog) for blog in blogs])
+    toolbar = BlogToolbar(tags)
+    blog_grid = Div(id="blog-grid", cls="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mt-8 justify-items-center")(*BlogGridItems(blogs, next_cursor))
 
-    pagination = DivHStacked(
-        Button(UkIcon("chevron-left"), cls=ButtonT.ghost),
-        Button("1", cls=(ButtonT.primary, "mx-1")),
-        Button("2", cls=(ButtonT.ghost, "mx-1")),
-        Button("3", cls=(ButtonT.ghost, "mx-1")),
-        Button(UkIcon("chevron-right"), cls=ButtonT.ghost),
-        cls="mt-8 justify-center space-x-2"
-    )
-
-    return Div(header, toolbar, blog_grid, pagination, NewBlogModal() if auth and get_user(auth).is_admin else None, cls="container mx-auto max-w-6xl px-4 py-8 space-y-8")
+    return Div(header, toolbar, blog_grid, NewBlogModal() if auth and get_user(auth).is_admin else None, cls="container mx-auto max-w-6xl px-4 py-8 space-y-8")
 
 def ProjectToolbar(tags, statuses, active_tag=None, active_status=None, sort_by="newest"):
     search_input = Div(
-        Input(
-            placeholder="Search projects...",
-            cls="w-full sm:w-[300px] bg-secondary border-border text-secondary-foreground hover:bg-secondary/80 focus:bg-secondary/80",
-            uk_icon="icon: search"
-        ),
+        SearchInput("Search projects...", "/search/projects", "#project-grid"),
         cls="flex-grow sm:flex-grow-0"
     )
     
@@ -472,13 +476,14 @@ def ProjectToolbar(tags, statuses, active_tag=None, active_status=None, sort_by=
         Div(H4("Technologies", cls=TextPresets.bold_sm), tag_filters, cls="space-y-2"),
     )
 
-def ProjectPage(projects, auth=None):
-    # Extract unique tags and statuses from all projects
-    all_tags = set()
-    all_statuses = set()
-    for project in projects:
-        all_tags.update(tag.strip() for tag in project.tags.split(','))
-        all_statuses.add(project.status)
+def ProjectGridItems(projects, next_cursor=None):
+    """One page of project cards, followed by a sentinel for the next page if there is one"""
+    return (*map(GridProjectCard, projects), LoadMore(f"/projects/more?{urlencode(dict(cursor=next_cursor))}") if next_cursor else None)
+
+def ProjectPage(projects, auth=None, next_cursor=None, tags=None, statuses=None):
+    # Extract unique tags and statuses from the projects unless the caller already has them
+    if tags is None: tags = sorted({tag.strip() for project in projects for tag in project.tags.split(',')})
+    if statuses is None: statuses = sorted({project.status for project in projects})
     
     header = DivFullySpaced(
         Div(
@@ -496,26 +501,17 @@ def ProjectPage(projects, auth=None):
         ) if auth and get_user(auth).is_admin else None
     )
     
-    toolbar = ProjectToolbar(sorted(all_tags), sorted(all_statuses))
+    toolbar = ProjectToolbar(tags, statuses)
     
     project_grid = Div(
+        id="project-grid",
         cls="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mt-8 justify-items-center"
-    )(*[ProjectCard(project) for project in projects])
-
-    pagination = DivHStacked(
-        Button(UkIcon("chevron-left"), cls=ButtonT.ghost),
-        Button("1", cls=(ButtonT.primary, "mx-1")),
-        Button("2", cls=(ButtonT.ghost, "mx-1")),
-        Button("3", cls=(ButtonT.ghost, "mx-1")),
-        Button(UkIcon("chevron-right"), cls=ButtonT.ghost),
-        cls="mt-8 justify-center space-x-2"
-    )
+    )(*ProjectGridItems(projects, next_cursor))
 
     return Div(
         header, 
         toolbar, 
         project_grid, 
-        pagination, 
         NewProjectModal() if auth and get_user(auth).is_admin else None,
         cls="container mx-auto max-w-6xl px-4 py-8 space-y-8"
     )
@@ -594,9 +590,9 @@ def BlogPost(auth=None):
         cls="container mx-auto max-w-3xl px-4 py-8 relative"  # Narrower max-width to allow space for TOC
     )
 
-def estimate_read_time(text, words_per_minute=200):
-    """Estimate reading time in minutes"""
-    word_count = len(text.split())
+def estimate_read_time(text="", words_per_minute=200, words=None):
+    """Estimate reading time in minutes, from `text` or an already known word count"""
+    word_count = len(text.split()) if words is None else words
     minutes = max(1, round(word_count / words_per_minute))
     return f"{minutes} min read"
 
@@ -611,7 +607,7 @@ def AuthorInfo(author_name, created_at):
     """Author avatar and details"""
     formatted_date = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%S.%f").strftime("%B %d, %Y")
     return DivLAligned(
-        Img(src="../static/github_profile.png", alt="Profile", cls="w-8 h-8 rounded-full mr-2"),
+        ResponsiveImg("static/github_profile.png", alt="Profile", width=32, height=32, cls="w-8 h-8 rounded-full mr-2"),
         Div(
             P(author_name, cls=TextT.lg + TextT.muted + TextT.secondary),
             P(formatted_date, cls=TextPresets.muted_sm)
@@ -619,9 +615,10 @@ def AuthorInfo(author_name, created_at):
         cls="gap-3"
     )
 
-def PostMetrics(views):
+def PostMetrics(views, read_time=None):
     """Reading time and view count"""
     return DivLAligned(
+        DivHStacked(UkIcon("clock"), P(read_time, cls=TextPresets.muted_sm)) if read_time else None,
         DivHStacked(UkIcon("eye"), P(f"{views} views", cls=TextPresets.muted_sm)),
         cls="gap-4"
     )
@@ -670,15 +667,15 @@ def NavButton(post, direction="left"):
     )
     
     content = DivRAligned(text_div, icon, cls="gap-2") if is_next else DivLAligned(icon, text_div, cls="gap-2")
-    return A(content, href=f"/blog/{post.url_slug}")
+    return A(content, href=f"/blog/{post.url_slug}", **BOOST)
 
-def BlogPostHeader(post):
+def BlogPostHeader(post, read_time=None):
     return Section(
         PostTags(post.tags),
         H1(post.title, cls=(TextT.lg + TextT.muted + TextT.primary, "text-4xl mb-6")),
         DivLAligned(
             AuthorInfo("Erik Gaasedelen", post.created_at),
-            PostMetrics(post.views),
+            PostMetrics(post.views, read_time),
             cls="justify-between items-center"
         ),
         ShareButtons(post),
@@ -698,12 +695,33 @@ def BlogPostNavigation(prev_post=None, next_post=None):
         cls="mt-12"
     )
 
-def FullBlogPost(post=None, prev_post=None, next_post=None, auth=None, token=None):
-    if post.url_slug == "build-a-personal-blog":
-        content = BuildPersonalSiteBlogPost(auth=auth, token=token)
+# Components a post can place with an `<!-- embed: name -->` line of its own
+POST_EMBEDS = {'github-insights': lambda auth: GithubInsightsPlaceholder() if auth else GithubInsights()}
+EMBED_MARKER = re.compile(r'<!-- embed: ([\w-]+) -->')
+
+def MarkdownPost(rendered, auth=None):
+    """A post from blogposts/{slug}.md, already rendered to HTML"""
+    parts = EMBED_MARKER.split(rendered.html)
+    body = [NotStr(p) if i % 2 == 0 else POST_EMBEDS[p](auth) if p in POST_EMBEDS else None for i, p in enumerate(parts)]
+    return Div(
+        HighlightStyles() if rendered.has_code else None,
+        TableOfContents(rendered.toc) if rendered.toc else None,
+        Div(*body, cls="prose max-w-none"),
+        cls="container mx-auto max-w-3xl px-4 py-8 relative"
+    )
+
+def PostUnavailable():
+    return Alert(DivLAligned(UkIcon("file-x"), P("This post's content isn't available yet.")), cls=(AlertT.info, "my-8"))
+
+def FullBlogPost(post=None, prev_post=None, next_post=None, auth=None):
+    read_time = None
+    if rendered := posts.get(post.url_slug):
+        content, read_time = MarkdownPost(rendered, auth=auth), estimate_read_time(words=rendered.words)
+    else:
+        content = PostUnavailable()
     
     return Div(
-        BlogPostHeader(post),
+        BlogPostHeader(post, read_time),
         content,
         #BlogPostNavigation(prev_post, next_post),
         cls="container mx-auto max-w-3xl px-4 py-8"
@@ -752,10 +770,10 @@ def LoginScreen(oauth_url):
 
     footer = Div(
         P("By continuing, you agree to our ",
-          A("Terms of Service", href="/tos", 
+          A("Terms of Service", href="/tos", **BOOST,
             cls=(AT.muted, "hover:text-primary transition-colors")),
           " and ",
-          A("Privacy Policy", href="/privacy", 
+          A("Privacy Policy", href="/privacy", **BOOST,
             cls=(AT.muted, "hover:text-primary transition-colors")),
           cls=(TextPresets.muted_sm, "text-secondary-foreground/70")),
         cls="mt-8 text-center"
@@ -767,7 +785,7 @@ def LoginScreen(oauth_url):
             "Back to home",
             cls="group-hover:transform group-hover:-translate-x-1 transition-transform"
         ),
-        href="/",
+        href="/", **BOOST,
         cls=(AT.muted, "mt-6 inline-flex hover:text-primary transition-colors group")
     )
 
@@ -1029,9 +1047,7 @@ def ContactRequests(requests):
     )
     
     toolbar = DivFullySpaced(
-        Input(placeholder="Search requests...", 
-              cls="w-64 bg-secondary border-border",
-              uk_icon="icon: search"),
+        SearchInput("Search requests...", "/search/contacts", "#contact-list", cls="w-64 bg-secondary border-border"),
         UkSelect(*Options("All", "Pending", "Responded", selected_idx=0), 
                 cls="w-32 ml-2 bg-secondary border-border"),
         cls="mb-6"
@@ -1049,7 +1065,7 @@ def ContactRequests(requests):
             cls="container mx-auto max-w-4xl px-4 py-8 space-y-6"
         )
     
-    return Div(header, toolbar, *map(ContactRequestCard, requests),
+    return Div(header, toolbar, Div(*map(ContactRequestCard, requests), id="contact-list"),
               cls="container mx-auto max-w-4xl px-4 py-8 space-y-6")
 
 
@@ -1246,6 +1262,21 @@ def AdminLoginForm():
         cls="p-6 bg-white dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 max-w-md mx-auto"
     )
 
+def BackupStatus(job):
+    "Progress of a database snapshot, polling until it's done, then its size and download links"
+    if job is None: return Alert("That backup has expired; start a new one.", cls=AlertT.warning)
+    if job.status == 'failed':
+        return Alert(DivLAligned(UkIcon("alert-triangle"), P(f"Backup failed: {job.error}", cls="text-white")), cls=AlertT.error)
+    if job.status == 'running':
+        return Div(Progress(value=int(job.progress*100), max=100),
+                   P(f"Copying page {job.pages - job.remaining} of {job.pages or '?'}...", cls=TextPresets.muted_sm),
+                   hx_get=f"/admin/backup/{job.id}", hx_trigger="load delay:500ms", hx_swap="outerHTML")
+    links = [A(DivLAligned(UkIcon("download", height=16), f"{label}"), href=f"/admin/backup/{job.id}/download?encoding={enc}",
+               cls=(ButtonT.secondary, "px-4 py-2 rounded-md"))
+             for enc, label in [('', "Download .sqlite"), ('gzip', "Download .sqlite.gz"), ('zstd', "Download .sqlite.zst")] if enc in BACKUP_ENCODINGS]
+    return Div(P(f"{job.name}: {job.size/1024/1024:.1f} MB, taken in {job.finished - job.started:.1f}s", cls=TextPresets.muted_sm),
+               DivLAligned(*links, cls="gap-3 mt-2 flex-wrap"))
+
 def AdminPage(session, auth=None):
     has_admin_rights = (auth and get_user(auth).is_admin) or session.get('admin_access')
     if not has_admin_rights:
@@ -1257,41 +1288,26 @@ def AdminPage(session, auth=None):
             cls="container mx-auto max-w-4xl p-4"
         )
     
-    db_files = [
-        ("Database", "personal_site.sqlite"),
-        ("Write-Ahead Log", "personal_site.sqlite-wal"),
-        ("Shared Memory File", "personal_site.sqlite-shm")
-    ]
-    
-    download_buttons = [
-        DivLAligned(
-            UkIcon(
-                "database" if name == "Database" else "file", 
-                height=20, 
-                cls="text-blue-500 dark:text-blue-400"
-            ),
-            A(
-                f"Download {name}", 
-                href=f"/admin/download/{filename}",
-                cls="inline-flex items-center px-4 py-2 bg-white dark:bg-zinc-800 border border-zinc-200 dark:border-zinc-700 rounded-md text-sm font-medium text-zinc-900 dark:text-zinc-100 hover:bg-zinc-50 dark:hover:bg-zinc-700 transition-colors"
-            ),
-            cls="gap-3"
-        ) for name, filename in db_files
-    ]
+    backup_button = Button(
+        DivLAligned(UkIcon("database", height=20), "Back Up Database"),
+        cls=ButtonT.primary,
+        hx_post="/admin/backup",
+        hx_target="#backup-status",
+        hx_swap="innerHTML"
+    )
 
     upload_form = Form(
-        P("Upload database files:", cls="text-zinc-700 dark:text-zinc-300 mb-2"),
+        P("Restore from a backup (.sqlite, .sqlite.gz or .sqlite.zst):", cls="text-zinc-700 dark:text-zinc-300 mb-2"),
         Input(
             type="file",
             name="database",
-            multiple=True,
-            accept=".sqlite,.sqlite-wal,.sqlite-shm",
+            accept=".sqlite,.gz,.zst",
             cls="mb-4 text-zinc-700 dark:text-zinc-300"
         ),
         Button(
             DivLAligned(
                 UkIcon("upload", height=20),
-                "Upload Files",
+                "Restore Database",
                 Loading(cls=(LoadingT.spinner + LoadingT.sm, "ml-2"), htmx_indicator=True)
             ),
             cls=(ButtonT.primary, "mt-2")
@@ -1308,11 +1324,13 @@ def AdminPage(session, auth=None):
             Card(
                 H3("Database Management", 
                    cls=(TextPresets.bold_sm, "mb-4 text-zinc-800 dark:text-zinc-200")),
-                Div(*download_buttons, cls="space-y-4"),
+                P("Takes a consistent snapshot of the live database, then offers it for download.", cls=(TextPresets.muted_sm, "mb-4")),
+                backup_button,
+                Div(id="backup-status", cls="mt-4"),
                 cls="p-6 bg-white dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800"
             ),
             Card(
-                H3("Upload Database", 
+                H3("Restore Database", 
                    cls=(TextPresets.bold_sm, "mb-4 text-zinc-800 dark:text-zinc-200")),
                 upload_form,
                 Div(id="upload-result"),
@@ -1326,11 +1344,14 @@ def AdminPage(session, auth=None):
 
 
 
-def CommonScreen(*c, auth=None):
+def CommonScreen(*c, auth=None, title=None):
+    title = Title(f"{title} · {SITE_NAME}" if title else SITE_NAME)
+    # A boosted navigation keeps the nav, modal and footer it already has; HTMX takes the new <title> from the fragment
+    if partial_request.get(): return title, *c
     user = get_user(auth)
-    return Div(
+    return title, Div(
         ErikNavBar(user=user),
-        *c,
+        Main(*c, id="content"),
         ContactModal(),
         Footer(),
         cls="min-h-screen bg-background"
@@ -1347,27 +1368,28 @@ def Home(auth=None):
     )
     
 def ListBlogs(auth=None):
-    blogs = get_blog_posts()
-    return CommonScreen(BlogPage(blogs, auth=auth), auth=auth)
+    blogs, next_cursor = get_blog_posts_page()
+    return CommonScreen(BlogPage(blogs, auth=auth, next_cursor=next_cursor, tags=get_blog_tags()), auth=auth, title="Blog")
 
 def ListProjects(auth=None):
-    projects = get_projects()
-    return CommonScreen(ProjectPage(projects, auth=auth), auth=auth)
+    projects, next_cursor = get_projects_page()
+    page = ProjectPage(projects, auth=auth, next_cursor=next_cursor, tags=get_project_tags(), statuses=get_project_statuses())
+    return CommonScreen(page, auth=auth, title="Projects")
 
-def BlogPostPage(post=None, auth=None, token=None):
-    return CommonScreen(FullBlogPost(post=post, auth=auth, token=token), auth=auth)
+def BlogPostPage(post=None, auth=None):
+    return CommonScreen(FullBlogPost(post=post, auth=auth), auth=auth, title=post.title)
 
 def LoginPage(oauth_url, auth=None):
-    return CommonScreen(LoginScreen(oauth_url), auth=auth)
+    return CommonScreen(LoginScreen(oauth_url), auth=auth, title="Sign In")
 
 def TermsOfServicePage(auth=None):
-    return CommonScreen(TermsOfService(), auth=auth)
+    return CommonScreen(TermsOfService(), auth=auth, title="Terms of Service")
 
 def PrivacyPolicyPage(auth=None):
-    return CommonScreen(PrivacyPolicy(), auth=auth)
+    return CommonScreen(PrivacyPolicy(), auth=auth, title="Privacy Policy")
 
 def ContactRequestsPage(auth=None):
     user = get_user(auth)
     requests = get_contact_requests()
-    if user.is_admin: return CommonScreen(ContactRequests(requests), auth=auth)
+    if user.is_admin: return CommonScreen(ContactRequests(requests), auth=auth, title="Contact Requests")
     else:             return RedirectResponse('/', status_code=303)
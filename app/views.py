@@ -0,0 +1,69 @@
+import logging, threading, time
+from collections import Counter
+from datetime import datetime
+from app.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+class ViewCounter:
+    "Write-behind buffer for blog view counts, flushed to SQLite as one `views = views + ?` transaction"
+    update_sql = "UPDATE blog SET views = views + ? WHERE url_slug = ?"
+    # Bumped with every flush, so conditional-request validators change only when stored counts do
+    epoch_sql = "UPDATE view_epoch SET epoch = epoch + 1, flushed_at = ? WHERE id = 1"
+
+    def __init__(self, pool, flush_interval=5.0):
+        self.pool, self.flush_interval = pool, flush_interval
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.flushes, self.flushed_views, self.last_flush = 0, 0, None
+        self._stop, self._thread = threading.Event(), None
+
+    def add(self, slug, n=1):
+        with self.lock: self.pending[slug] += n
+
+    def pending_views(self, slug):
+        with self.lock: return self.pending.get(slug, 0)
+
+    def merge(self, post):
+        "Add any buffered views for `post` so rendered counts stay accurate between flushes"
+        if post is not None: post.views = int(post.views or 0) + self.pending_views(post.url_slug)
+        return post
+
+    def flush(self):
+        with self.lock: batch, self.pending = self.pending, Counter()
+        if not batch: return 0
+        try:
+            with self.pool.write() as db, db.conn:
+                db.conn.executemany(self.update_sql, [(n, slug) for slug, n in batch.items()])
+                db.conn.execute(self.epoch_sql, [datetime.now().isoformat()])
+        except Exception:
+            # Put the increments back so a failed flush never loses views
+            with self.lock: self.pending.update(batch)
+            raise
+        metrics.inc('db_rows_written_total', len(batch), table='blog', op='views')
+        n = sum(batch.values())
+        self.flushes, self.flushed_views, self.last_flush = self.flushes + 1, self.flushed_views + n, time.time()
+        return n
+
+    def stats(self):
+        with self.lock: slugs, views = len(self.pending), sum(self.pending.values())
+        return dict(flush_interval=self.flush_interval, pending_slugs=slugs, pending_views=views,
+                    flushes=self.flushes, flushed_views=self.flushed_views, last_flush=self.last_flush)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            # `flush` has already put the batch back, so the next tick retries it
+            try: self.flush()
+            except Exception: log.exception("View counter flush failed; %s views kept for the next one", self.stats()['pending_views'])
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join()
+        try: self.flush()
+        except Exception: log.exception("Final view counter flush failed; %s views not saved", self.stats()['pending_views'])
@@ -0,0 +1,219 @@
+"""Continuous backups by shipping committed WAL frames to a local directory, with point-in-time restore
+
+    python -m app.walbackup list    --dir /var/backups/site
+    python -m app.walbackup restore --dir /var/backups/site --to 2025-02-20T12:00:00 --out restored.sqlite
+
+Layout: one directory per generation, holding `base.sqlite.gz` (a full copy) and `NNNNNNNN-<unix time>.wal.gz`
+segments of raw WAL frames committed after it. A new generation starts daily, or whenever continuity is lost.
+
+`dir` must be outside the site root, where the static route would serve its segments. With several workers only one ships: whichever holds the flock on `dir`/.lock, which passes on when it exits.
+"""
+import argparse, fcntl, gzip, json, logging, os, shutil, struct, sys, tempfile, threading, time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import apsw
+from app.db import pragma_profile
+from app.backup import private_dir
+
+log = logging.getLogger(__name__)
+WAL_HEADER, FRAME_HEADER = 32, 24
+
+def read_frames(path, offset=0, salt=None):
+    "`(frames, end, salt, page_size)`: raw committed frames after `offset`; `frames` is None if `salt` no longer matches"
+    try: f = open(path, 'rb')
+    except FileNotFoundError: return b'', 0, None, None
+    with f:
+        hdr = f.read(WAL_HEADER)
+        if len(hdr) < WAL_HEADER: return b'', 0, None, None
+        page_size, wal_salt = struct.unpack('>I', hdr[8:12])[0], hdr[16:24]
+        if salt is not None and wal_salt != salt: return None, 0, wal_salt, page_size
+        pos = max(offset, WAL_HEADER)
+        f.seek(pos)
+        frames, committed = [], 0
+        while len(frame := f.read(FRAME_HEADER + page_size)) == FRAME_HEADER + page_size and frame[8:16] == wal_salt:
+            frames.append(frame)
+            # Non-zero "database size" marks the last frame of a transaction; never ship a partial one
+            if struct.unpack('>I', frame[4:8])[0]: committed = len(frames)
+        return b''.join(frames[:committed]), pos + committed*(FRAME_HEADER + page_size), wal_salt, page_size
+
+def apply_frames(f, frames, page_size):
+    "Write each frame's page into the open database file `f`, truncating at every commit to the size it records"
+    step = FRAME_HEADER + page_size
+    for i in range(0, len(frames), step):
+        pgno, size = struct.unpack('>II', frames[i:i+8])
+        f.seek((pgno - 1) * page_size)
+        f.write(frames[i+FRAME_HEADER:i+step])
+        if size: f.truncate(size * page_size)
+
+class WalShipper:
+    "Ships the live database's committed WAL frames to `dir` every `interval` seconds, then checkpoints"
+    def __init__(self, pool, dir=None, interval=10.0, retention=7*86400, snapshot_every=86400):
+        self.pool, self.dir, self.interval = pool, Path(private_dir(dir, "WAL_BACKUP_DIR")) if dir else None, interval
+        self.retention, self.snapshot_every = retention, snapshot_every
+        self.gen = self.salt = self.pool_generation = None
+        self.offset = self.seq = 0
+        self.gen_started, self.backfilled = 0.0, False
+        self.ships = self.snapshots = self.frames = self.bytes = 0
+        self.last_ship = None
+        self.lock_file = self.pause_con = None
+        self._stop, self._thread = threading.Event(), None
+
+    def leader(self):
+        "Whether this process ships: the first to take the flock on `dir`/.lock, held until it exits"
+        if self.lock_file is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            f = open(self.dir/".lock", 'a')
+            try: fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                return False
+            self.lock_file = f
+        return True
+
+    @contextmanager
+    def writers_paused(self):
+        "Hold SQLite's write lock on a side connection, so no worker commits between reading the WAL and checkpointing it"
+        if self.pause_con is None:
+            self.pause_con = apsw.Connection(self.pool.path)
+            self.pause_con.setbusytimeout(int(pragma_profile(self.pool.pragmas)['busy_timeout']))
+        self.pause_con.execute("BEGIN IMMEDIATE")
+        try: yield
+        finally: self.pause_con.execute("ROLLBACK")
+
+    def ship(self):
+        "Ship every frame committed since the last call (or a new base copy if continuity is lost), then checkpoint"
+        if not self.leader(): return 0
+        with self.pool.write_lock, self.writers_paused():
+            db = self.pool.open()
+            stale = self.gen is None or self.pool_generation != self.pool.generation or time.time() - self.gen_started > self.snapshot_every
+            if not stale:
+                frames, end, salt, page_size = read_frames(self.pool.path + '-wal', self.offset, self.salt)
+                # The WAL restarted; harmless if our last checkpoint had already copied every frame back
+                if frames is None and self.backfilled: frames, end, salt, page_size = read_frames(self.pool.path + '-wal')
+                stale = frames is None
+            if stale: copy = self._copy(db)
+            else:
+                if frames:
+                    self.seq += 1
+                    seg = self.gen/f"{self.seq:08d}-{time.time():.3f}.wal.gz"
+                    tmp = seg.with_suffix('.tmp')
+                    tmp.write_bytes(gzip.compress(frames, 6))
+                    os.replace(tmp, seg)
+                    self.frames, self.bytes = self.frames + len(frames)//(FRAME_HEADER + page_size), self.bytes + len(frames)
+                self.offset, self.salt = end, salt
+                self._checkpoint(db)
+                self.ships, self.last_ship = self.ships + 1, time.time()
+        # Compressing a whole copy takes a while, so it happens once writers are running again
+        if stale: return self._publish(copy)
+        self.prune()
+        return len(frames)
+
+    def _checkpoint(self, db):
+        # PASSIVE, as TRUNCATE would need the write lock `writers_paused` holds; the next commit after a full backfill
+        # restarts the WAL under a new salt, which `ship` recognises
+        busy, log, done = db.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        self.backfilled = log == done
+
+    def _copy(self, db):
+        "Start a generation: copy every page to a temp file and note where the WAL ends; with writers paused the two match"
+        self.gen = self.dir/f"{datetime.now():%Y%m%dT%H%M%S}-{os.urandom(2).hex()}"
+        self.gen.mkdir(parents=True)
+        fd, tmp = tempfile.mkstemp(suffix=".sqlite", dir=self.gen)
+        os.close(fd)
+        dest = apsw.Connection(tmp)
+        try:
+            with dest.backup("main", db.conn, "main") as b: b.step(-1)
+            dest.execute("PRAGMA journal_mode=DELETE")
+        finally: dest.close()
+        self.pool_generation, self.gen_started, self.seq = self.pool.generation, time.time(), 0
+        _, self.offset, self.salt, _ = read_frames(self.pool.path + '-wal')
+        self._checkpoint(db)
+        return tmp
+
+    def _publish(self, tmp):
+        "Compress the copy into base.sqlite.gz, then write meta.json, which marks the generation complete"
+        with open(tmp, 'rb') as src, gzip.open(self.gen/"base.tmp", 'wb', 6) as out: shutil.copyfileobj(src, out)
+        os.replace(self.gen/"base.tmp", self.gen/"base.sqlite.gz")
+        os.remove(tmp)
+        (self.gen/"meta.json").write_text(json.dumps(dict(created_at=time.time(), path=str(self.pool.path))))
+        self.snapshots += 1
+        return 0
+
+    def prune(self):
+        "Delete generations whose newest file is older than `retention`, never the current one"
+        cutoff = time.time() - self.retention
+        for gen in generations(self.dir):
+            if gen != self.gen and max(p.stat().st_mtime for p in gen.iterdir()) < cutoff: shutil.rmtree(gen)
+
+    def stats(self):
+        return dict(enabled=self.dir is not None, leader=self.lock_file is not None, generation=self.gen and self.gen.name, segments=self.seq, ships=self.ships,
+                    snapshots=self.snapshots, frames=self.frames, bytes=self.bytes, last_ship=self.last_ship)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try: self.ship()
+            except Exception: log.exception("WAL shipping to %s failed", self.dir)
+
+    def start(self):
+        if self.dir is None or (self._thread and self._thread.is_alive()): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wal-shipper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self.dir is None: return
+        self._stop.set()
+        if self._thread: self._thread.join()
+        self.ship()
+
+def created_at(gen): return json.loads((gen/"meta.json").read_text())['created_at']
+
+def generations(dir):
+    "Complete generations in `dir` (meta.json is written last), oldest first"
+    return sorted((p for p in Path(dir).iterdir() if (p/"meta.json").exists()), key=created_at) if Path(dir).exists() else []
+
+def segments(gen):
+    "`(shipped_at, path)` for each segment of `gen`, in order"
+    return sorted((float(p.name.split('-', 1)[1].removesuffix('.wal.gz')), p) for p in gen.glob("*.wal.gz"))
+
+def restore(dir, out, to=None):
+    "Rebuild the database as of `to` (unix time; latest if None) into `out`; returns the time restored to"
+    gens = [g for g in generations(dir) if to is None or created_at(g) <= to]
+    if not gens: raise ValueError(f"no backup generation in {dir} starts before the requested time")
+    gen = gens[-1]
+    with gzip.open(gen/"base.sqlite.gz", 'rb') as src, open(out, 'wb') as f: shutil.copyfileobj(src, f)
+    restored_to = created_at(gen)
+    con = apsw.Connection(str(out))
+    page_size = con.execute("PRAGMA page_size").fetchone()[0]
+    con.close()
+    with open(out, 'r+b') as f:
+        for shipped_at, seg in segments(gen):
+            if to is not None and shipped_at > to: break
+            apply_frames(f, gzip.decompress(seg.read_bytes()), page_size)
+            restored_to = shipped_at
+    return restored_to
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("command", choices=["list", "restore"])
+    p.add_argument("--dir", default=os.getenv("WAL_BACKUP_DIR"), required=not os.getenv("WAL_BACKUP_DIR"),
+                   help="backup directory (default: $WAL_BACKUP_DIR)")
+    p.add_argument("--to", help="ISO time to restore to (default: latest)")
+    p.add_argument("--out", default="restored.sqlite")
+    args = p.parse_args()
+    if args.command == "list":
+        for gen in generations(args.dir):
+            segs = segments(gen)
+            start = created_at(gen)
+            end = segs[-1][0] if segs else start
+            size = sum(s.stat().st_size for s in gen.iterdir())
+            print(f"{gen.name}: {datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S} .. {datetime.fromtimestamp(end):%Y-%m-%d %H:%M:%S}, "
+                  f"{len(segs)} segments, {size//1024} KB")
+    else:
+        from app.backup import validate_database
+        to = datetime.fromisoformat(args.to).timestamp() if args.to else None
+        at = restore(args.dir, args.out, to)
+        problems = validate_database(args.out)
+        print(f"Restored {args.out} as of {datetime.fromtimestamp(at):%Y-%m-%d %H:%M:%S}" + (f"; PROBLEMS: {problems}" if problems else ""))
+        sys.exit(1 if problems else 0)
@@ -0,0 +1,83 @@
+"""Per-component render cost: FT construction and `to_xml` separately, and the compiled card path; that the compiled
+path renders the same bytes is tested in tests/test_compiled.py
+
+    python bench/components.py --rows 12 --repeat 200
+"""
+import argparse, json, os, random, statistics, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+def timeit(fn, repeat):
+    "Median microseconds per call"
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(statistics.median(times) * 1e6, 1)
+
+def peak_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally: tracemalloc.stop()
+
+def rows(n, rng):
+    tags = ["python", "web", "htmx", "sqlite", "ml", "rust"]
+    stamp = lambda i: (datetime(2024, 1, 1) + timedelta(hours=i)).isoformat(timespec='microseconds')
+    blogs = [SimpleNamespace(title=f'Post {i} "quoted" & <tagged>', description=f"About {tags[i % 6]} " * 8, image_url="/static/personal_site.png",
+                             created_at=stamp(i), url_slug=f"post-{i}", views=rng.randrange(1000), tags=", ".join(rng.sample(tags, i % 3)))
+             for i in range(n)]
+    projects = [SimpleNamespace(title=f"Project {i}'s", description="Something built " * 6, image_url="/static/personal_site.png",
+                                project_url="https://example.com/?a=1&b=2", github_url="https://github.com/example" if i % 4 else None,
+                                featured=i % 2 == 0, status=rng.choice(["completed", "in-progress", "archived", "other"]),
+                                tags=", ".join(rng.sample(tags, i % 3))) for i in range(n)]
+    return blogs, projects
+
+def measure(build, repeat, compiled=None):
+    "Build and `to_xml` cost of `build()`, plus the end-to-end cost with compiled cards when `compiled` is given"
+    from fasthtml.common import to_xml
+    import app.ui as ui
+    ui.COMPILED_CARDS = False
+    tree = build()
+    html = to_xml(tree)
+    out = dict(build_us=timeit(build, repeat), to_xml_us=timeit(lambda: to_xml(tree), repeat), total_us=timeit(lambda: to_xml(build()), repeat),
+               peak_kb=peak_kb(lambda: to_xml(build())), bytes=len(html))
+    if compiled:
+        ui.COMPILED_CARDS = True
+        out.update(compiled_us=timeit(lambda: to_xml(compiled()), repeat), compiled_peak_kb=peak_kb(lambda: to_xml(compiled())))
+        out['speedup'] = round(out['total_us'] / out['compiled_us'], 1)
+    return out
+
+def main(args):
+    import app.ui as ui
+    blogs, projects = rows(args.rows, random.Random(args.seed))
+    b, p = blogs[0], projects[1]
+    res = dict(
+        BlogCard=measure(lambda: ui.BlogCard(b), args.repeat, lambda: ui.GridBlogCard(b)),
+        ProjectCard=measure(lambda: ui.ProjectCard(p), args.repeat, lambda: ui.GridProjectCard(p)),
+        LatestBlogs=measure(lambda: ui.LatestBlogs(blogs), args.repeat, lambda: ui.LatestBlogs(blogs)),
+        BlogPage=measure(lambda: ui.BlogPage(blogs, tags=[]), args.repeat, lambda: ui.BlogPage(blogs, tags=[])),
+        ProjectsSection=measure(lambda: ui.ProjectsSection(projects), args.repeat, lambda: ui.ProjectsSection(projects)),
+        ProjectPage=measure(lambda: ui.ProjectPage(projects, tags=[], statuses=[]), args.repeat, lambda: ui.ProjectPage(projects, tags=[], statuses=[])),
+        BlogGridItems=measure(lambda: ui.BlogGridItems(blogs, "next"), args.repeat, lambda: ui.BlogGridItems(blogs, "next")),
+        HeroSection=measure(ui.HeroSection, args.repeat),
+        ErikNavBar=measure(ui.ErikNavBar, args.repeat),
+        Footer=measure(ui.Footer, args.repeat),
+        ContactModal=measure(ui.ContactModal, args.repeat),
+    )
+    res['templates'] = dict(blog_card=ui.blog_card.stats(), project_card=ui.project_card.stats(), card_image=ui.card_image.stats())
+    print(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=12, help="cards per grid")
+    p.add_argument("--repeat", type=int, default=200)
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, root)
+    os.chdir(tempfile.mkdtemp())  # scratch database; cards only need static/ to resolve their images
+    os.symlink(os.path.join(root, "static"), "static")
+    main(args)
@@ -0,0 +1,47 @@
+"""Event-loop latency while contact submissions are written, with writes inline on the loop vs. through `app.aio.adb`
+
+    python bench/event_loop_latency.py --writes 500 --concurrency 50
+"""
+import argparse, asyncio, json, os, statistics, sys, tempfile, time
+
+def pct(xs, p): return sorted(xs)[min(len(xs)-1, int(len(xs)*p/100))] if xs else 0.0
+
+async def measure(write, n, concurrency, tick=0.001):
+    "Run `n` writes `concurrency` at a time while a ticker records how late each 1ms sleep wakes up"
+    lags, done = [], asyncio.Event()
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append((time.perf_counter() - start - tick) * 1000)
+    sem = asyncio.Semaphore(concurrency)
+    async def one(i):
+        async with sem: await write(dict(name=f"bench {i}", email=f"bench{i}@example.com", message="event loop latency benchmark"))
+    t = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(n)])
+    elapsed = time.perf_counter() - start
+    done.set(); await t
+    return dict(writes=n, seconds=round(elapsed, 3), writes_per_sec=round(n/elapsed, 1), ticks=len(lags),
+                lag_ms_mean=round(statistics.fmean(lags), 3) if lags else None, lag_ms_p50=round(pct(lags, 50), 3),
+                lag_ms_p99=round(pct(lags, 99), 3), lag_ms_max=round(max(lags, default=0), 3))
+
+async def main(args):
+    import app.api as api
+    from app.aio import adb
+    async def inline(c): api.store_contact_request(c)
+    async def offloaded(c): await adb.store_contact_request(c)
+    res = dict(inline=await measure(inline, args.writes, args.concurrency),
+               executor=await measure(offloaded, args.writes, args.concurrency))
+    res['executor']['pool'] = adb.stats()
+    adb.shutdown()
+    print(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--writes", type=int, default=500)
+    p.add_argument("--concurrency", type=int, default=50)
+    args = p.parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.chdir(tempfile.mkdtemp())  # benchmark against a scratch database, never the live one
+    asyncio.run(main(args))
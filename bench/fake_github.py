@@ -0,0 +1,73 @@
+"""Local stand-in for the GitHub REST API, with ETags, 304s and rate-limit headers
+
+    python bench/fake_github.py --port 8765
+    GITHUB_API_URL=http://127.0.0.1:8765 python main.py
+"""
+import argparse, hashlib, json, re, threading, time, zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+def fake_user(username):
+    # crc32 rather than `hash`, which is salted per process, so a user keeps their id across runs and workers
+    return dict(login=username, id=zlib.crc32(username.encode()) % 10**8, public_repos=12, followers=34, following=5,
+                created_at="2015-06-01T00:00:00Z", name=username.title(), email=None, bio="", avatar_url="")
+
+def fake_repos(username, n):
+    langs = ["Python", "Python", "JavaScript", "Rust", None]
+    return [dict(name=f"repo{i}", full_name=f"{username}/repo{i}", language=langs[i % len(langs)]) for i in range(n)]
+
+class FakeGitHub(ThreadingHTTPServer):
+    "Threaded HTTP server answering the handful of GitHub endpoints the site uses; counts every request it serves"
+    daemon_threads = True
+    def __init__(self, addr=("127.0.0.1", 0), latency=0.0):
+        super().__init__(addr, Handler)
+        self.latency, self.requests, self.not_modified, self.rate_remaining = latency, 0, 0, 5000
+        self.lock = threading.Lock()
+
+    @property
+    def url(self): return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args): pass
+
+    def _send(self, status, body=None, headers=None):
+        self.send_response(status)
+        for k,v in {**(headers or {}), 'X-RateLimit-Remaining': str(self.server.rate_remaining)}.items(): self.send_header(k, v)
+        data = json.dumps(body).encode() if body is not None else b''
+        if body is not None: self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock: srv.requests += 1
+        if srv.latency: time.sleep(srv.latency)
+        url = urlparse(self.path)
+        if url.path in ('/user', '/login/oauth/access_token'): body = fake_user("octocat")
+        elif m := re.fullmatch(r'/users/([^/]+)', url.path): body = fake_user(m[1])
+        elif m := re.fullmatch(r'/users/([^/]+)/repos', url.path):
+            per_page = int(dict(p.split('=', 1) for p in url.query.split('&') if '=' in p).get('per_page', 30))
+            body = fake_repos(m[1], min(per_page, 30))
+        else: return self._send(404, dict(message="Not Found"))
+        etag = '"' + hashlib.md5(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            with srv.lock: srv.not_modified += 1
+            return self._send(304, headers={'ETag': etag})
+        with srv.lock: srv.rate_remaining -= 1
+        self._send(200, body, {'ETag': etag})
+
+    do_POST = do_GET
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--latency", type=float, default=0.0, help="seconds to sleep before each response")
+    args = p.parse_args()
+    srv = FakeGitHub(("127.0.0.1", args.port), args.latency)
+    print(f"Fake GitHub API on {srv.url}")
+    srv.serve_forever()
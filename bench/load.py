@@ -0,0 +1,207 @@
+"""Load test: seed a scratch database, then drive the app in-process (ASGI) and over a real socket (uvicorn)
+
+    python bench/load.py --blogs 200 --projects 50 --contacts 1000 --users 50 --requests 2000 --concurrency 20 > run.json
+    python bench/load.py --compare before.json > after.json    # also prints p50/p95 changes per route to stderr
+
+GitHub is replaced by `FakeGitHub` (via GITHUB_API_URL) and OAuth by signed session cookies, so nothing leaves the
+machine. Client and server share one process, so compare numbers between commits on the same machine, not absolutely.
+"""
+import argparse, asyncio, base64, json, os, random, shutil, socket, statistics, subprocess, sys, tempfile, threading, time, tracemalloc
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def pct(xs, p): return sorted(xs)[min(len(xs)-1, int(len(xs)*p/100))] if xs else 0.0
+
+def summary(lat, seconds=None, errors=0):
+    "Latency percentiles in ms for a list of seconds"
+    ms = [x*1000 for x in lat]
+    out = dict(requests=len(ms), errors=errors, p50=round(pct(ms, 50), 2), p95=round(pct(ms, 95), 2), p99=round(pct(ms, 99), 2),
+               mean=round(statistics.fmean(ms), 2) if ms else 0.0)
+    if seconds: out.update(seconds=round(seconds, 3), rps=round(len(ms)/seconds, 1))
+    return out
+
+def seed(api, blogs, projects, contacts, users, rng):
+    "Bulk-insert synthetic rows through the app's own writer connection"
+    start = datetime(2024, 1, 1)
+    stamp = lambda i: (start + timedelta(hours=i)).isoformat(timespec='microseconds')
+    tags = ["python", "web", "htmx", "sqlite", "ml", "rust"]
+    with api.writer() as db:
+        db.t.user.insert_all([dict(github_id=1000+i, username=f"user{i}", display_name=f"User {i}", email=f"user{i}@example.com",
+                                   avatar_url="", bio="", created_at=stamp(i), last_login=stamp(i), is_admin=i == 0) for i in range(users)])
+        db.t.blog.insert_all([dict(title=f"Post {i}", description=f"About {tags[i % 6]} " * 8, image_url="/static/personal_site.png",
+                                   created_at=stamp(i), updated_at=stamp(i), url_slug=f"post-{i}", published=True, author_id=1000,
+                                   views=rng.randrange(1000), tags=", ".join(rng.sample(tags, 2))) for i in range(blogs)])
+        db.t.project.insert_all([dict(title=f"Project {i}", description="Something built " * 6, image_url="/static/personal_site.png",
+                                      project_url="https://example.com", github_url="https://github.com/example", created_at=stamp(i),
+                                      updated_at=stamp(i), author_id=1000, featured=i < 6, status=rng.choice(["completed", "in-progress"]),
+                                      tags=", ".join(rng.sample(tags, 2))) for i in range(projects)])
+        db.t.contact.insert_all([dict(name=f"Visitor {i}", email=f"v{i}@example.com", message="Hello there " * 10, created_at=stamp(i),
+                                      deleted=False, responded=i % 3 == 0, response_date=None) for i in range(contacts)])
+    api.page_cache.invalidate()
+
+def session_cookie(app, data):
+    "A Cookie header with a session Starlette's SessionMiddleware accepts, standing in for a completed GitHub OAuth login"
+    from itsdangerous import TimestampSigner
+    from starlette.middleware.sessions import SessionMiddleware
+    mw = next(m for m in app.user_middleware if m.cls is SessionMiddleware)
+    signed = TimestampSigner(str(mw.kwargs['secret_key'])).sign(base64.b64encode(json.dumps(data).encode()))
+    return {'Cookie': f"{mw.kwargs['session_cookie']}={signed.decode()}"}
+
+def scenarios(args):
+    "(name, weight, method, url, authed, form); names are stable so runs can be compared"
+    slug = lambda r: f"/blog/post-{r.randrange(max(args.blogs, 1))}"
+    return [
+        ("home", 20, "GET", lambda r: "/", False, None),
+        ("home_auth", 5, "GET", lambda r: "/", True, None),
+        ("blogposts", 10, "GET", lambda r: "/blogposts", False, None),
+        ("blogposts_partial", 5, "GET", lambda r: "/blogposts", False, "partial"),
+        ("projects", 8, "GET", lambda r: "/projects", False, None),
+        ("blog_post", 25, "GET", slug, False, None),
+        ("blog_post_auth", 5, "GET", slug, True, None),
+        ("search_blogs", 5, "GET", lambda r: f"/search/blogs?q={r.choice(['python', 'htmx', 'sqlite', 'post 1'])}", False, None),
+        ("github_insights", 4, "GET", lambda r: "/github/insights", True, None),
+        ("contact_post", 3, "POST", lambda r: "/api/contact", False,
+         lambda r: dict(name="Load Test", email="load@example.com", message="benchmark message " * 5)),
+    ]
+
+def schedule(args):
+    "The same `args.requests` requests, in the same order, for every run with the same seed"
+    rng, items = random.Random(args.seed), scenarios(args)
+    picks = rng.choices(items, weights=[s[1] for s in items], k=args.requests)
+    return [(name, method, url(rng), authed, form(rng) if callable(form) else form) for name, _, method, url, authed, form in picks]
+
+def request_headers(form, authed, session):
+    return {**({'HX-Request': 'true', 'HX-Target': 'content'} if form == 'partial' else {}), **(session if authed else {})}
+
+async def drive(client, plan, concurrency, session):
+    "Closed loop: `concurrency` workers send the planned requests back to back"
+    lat, errors, it = {}, {}, iter(plan)
+    async def worker():
+        for name, method, url, authed, form in it:
+            headers = request_headers(form, authed, session)
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, url, headers=headers, data=form if isinstance(form, dict) else None)
+                ok = r.status_code < 400
+            except Exception: ok = False
+            lat.setdefault(name, []).append(time.perf_counter() - start)
+            if not ok: errors[name] = errors.get(name, 0) + 1
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    seconds = time.perf_counter() - start
+    return dict(total=summary([x for xs in lat.values() for x in xs], seconds, sum(errors.values())),
+                routes={k: summary(v, errors=errors.get(k, 0)) for k, v in sorted(lat.items())})
+
+@asynccontextmanager
+async def lifespan(app):
+    "Run the app's startup/shutdown hooks once, around both the in-process and the socket runs"
+    inbox, started, stopped = asyncio.Queue(), asyncio.Event(), asyncio.Event()
+    async def send(msg): (started if msg['type'].startswith('lifespan.startup') else stopped).set()
+    task = asyncio.create_task(app({'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}}, inbox.get, send))
+    await inbox.put({'type': 'lifespan.startup'}); await started.wait()
+    try: yield
+    finally:
+        await inbox.put({'type': 'lifespan.shutdown'}); await stopped.wait(); await task
+
+def serve_socket(app):
+    "uvicorn on a free localhost port in a background thread; lifespan is already running, so it's off here"
+    import uvicorn
+    with socket.socket() as s: s.bind(("127.0.0.1", 0)); port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started: time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+async def allocations(client, args, session, n=20):
+    "Per route: median peak and retained traced memory (KB) of one request, measured sequentially under tracemalloc"
+    out, rng = {}, random.Random(args.seed)
+    tracemalloc.start()
+    try:
+        for name, _, method, url, authed, form in scenarios(args):
+            peaks, kept = [], []
+            for _ in range(n):
+                data, headers = form(rng) if callable(form) else None, request_headers(form, authed, session)
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                await client.request(method, url(rng), headers=headers, data=data)
+                now, peak = tracemalloc.get_traced_memory()
+                peaks.append((peak - before) / 1024); kept.append((now - before) / 1024)
+            out[name] = dict(peak_kb=round(statistics.median(peaks), 1), retained_kb=round(statistics.median(kept), 1))
+    finally: tracemalloc.stop()
+    return out
+
+async def run(args):
+    import httpx
+    from fake_github import FakeGitHub
+    github = FakeGitHub(latency=args.github_latency).start()
+    os.environ.update(GITHUB_API_URL=github.url, GITHUB_CLIENT_ID="bench", GITHUB_CLIENT_SECRET="bench",
+                      REQUEST_LOG_LEVEL="ERROR", METRICS_DIR=os.path.join(os.getcwd(), "metrics"))
+    if args.no_page_cache: os.environ["PAGE_CACHE"] = "0"
+    import main, app.api as api
+    seed(api, args.blogs, args.projects, args.contacts, args.users, random.Random(args.seed))
+    session = session_cookie(main.app, dict(auth=1000 + min(1, args.users - 1)))
+    plan, res = schedule(args), {}
+    async with lifespan(main.app):
+        if args.mode in ("inprocess", "both"):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(main.app), base_url="http://bench") as client:
+                await drive(client, plan[:args.warmup], args.concurrency, session)
+                res['inprocess'] = await drive(client, plan, args.concurrency, session)
+                if not args.no_alloc: res['allocations'] = await allocations(client, args, session)
+        if args.mode in ("socket", "both"):
+            server, url = serve_socket(main.app)
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+                await drive(client, plan[:args.warmup], args.concurrency, session)
+                res['socket'] = await drive(client, plan, args.concurrency, session)
+            server.should_exit = True
+    res['github'] = dict(requests=github.requests, not_modified=github.not_modified)
+    github.shutdown()
+    return res
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError: return None
+
+def compare(old, new):
+    "p50/p95 change per route and mode, as lines for stderr"
+    lines = []
+    for mode in ("inprocess", "socket"):
+        if mode not in old or mode not in new: continue
+        for route, r in [("TOTAL", new[mode]['total']), *new[mode]['routes'].items()]:
+            o = old[mode]['total'] if route == "TOTAL" else old[mode]['routes'].get(route)
+            if not o: continue
+            delta = lambda k: f"{o[k]:>8.2f} -> {r[k]:>8.2f} ms ({(r[k]-o[k])/o[k]*100 if o[k] else 0:+.0f}%)"
+            lines.append(f"{mode:>9} {route:<18} p50 {delta('p50')}   p95 {delta('p95')}")
+    return lines
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--blogs", type=int, default=200)
+    p.add_argument("--projects", type=int, default=50)
+    p.add_argument("--contacts", type=int, default=1000)
+    p.add_argument("--users", type=int, default=50)
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--warmup", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=20)
+    p.add_argument("--mode", choices=["inprocess", "socket", "both"], default="both")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--github-latency", type=float, default=0.02, help="seconds the fake GitHub waits per request")
+    p.add_argument("--no-page-cache", action="store_true", help="render every page (PAGE_CACHE=0)")
+    p.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    p.add_argument("--compare", help="earlier JSON output to diff against")
+    args = p.parse_args()
+    sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+    # Benchmark a scratch database in a scratch directory, never the live one
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    for d in ("static", "blogposts"):
+        if os.path.isdir(os.path.join(ROOT, d)): shutil.copytree(os.path.join(ROOT, d), os.path.join(scratch, d))
+    os.chdir(scratch)
+    meta = dict(commit=git_commit(), python=sys.version.split()[0], time=datetime.now().isoformat(timespec='seconds'),
+                **{k: v for k, v in vars(args).items() if k != 'compare'})
+    out = dict(meta=meta, **asyncio.run(run(args)))
+    print(json.dumps(out, indent=2))
+    if args.compare:
+        with open(args.compare) as f: print("\n".join(compare(json.load(f), out)), file=sys.stderr)
+    shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,113 @@
+"""Cold start of `main`: import time per module, plus boot phases timed over several fresh interpreters
+
+    python bench/startup.py --runs 5 > boot.json               # phases, the imports `main` pulls in, slowest modules
+    python bench/startup.py --max-boot-ms 800                  # exit 1 if the median boot (import + startup) is over budget
+    python bench/startup.py --compare boot.json --max-regression 15   # or if it grew more than 15% since boot.json
+
+Each run starts a new interpreter in a scratch directory with no database, so startup includes creating it.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+
+# Run in the child: import main, run its startup hooks, then serve one request, straight over ASGI (no HTTP client to import)
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+import asyncio
+async def boot():
+    inbox, out = asyncio.Queue(), asyncio.Queue()
+    await inbox.put({'type': 'lifespan.startup'})
+    task = asyncio.create_task(main.app({'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}}, inbox.get, out.put))
+    assert (await out.get())['type'] == 'lifespan.startup.complete'
+    started = time.perf_counter()
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': '/',
+             'raw_path': b'/', 'query_string': b'', 'root_path': '', 'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 1),
+             'server': ('localhost', 80), 'state': {}}
+    sent = []
+    async def receive(): return {'type': 'http.request', 'body': b'', 'more_body': False}
+    async def send(msg): sent.append(msg)
+    await main.app(scope, receive, send)
+    served = time.perf_counter()
+    await inbox.put({'type': 'lifespan.shutdown'}); await out.get(); await task
+    return started, served, sent[0]['status']
+started, served, status = asyncio.run(boot())
+ms = lambda a, b: round((b - a) * 1000, 1)
+print(json.dumps(dict(import_ms=ms(start, imported), startup_ms=ms(imported, started), first_request_ms=ms(started, served),
+                      boot_ms=ms(start, started), status=status, modules=len(sys.modules))))
+"""
+
+def scratch(root, d):
+    "`d` set up like a fresh deploy of `root`: its static files and posts, and no database yet"
+    for name in ("static", "blogposts"):
+        if not os.path.exists(os.path.join(d, name)): os.symlink(os.path.join(root, name), os.path.join(d, name))
+    return d
+
+def child_env(root):
+    return {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])),
+            "METRICS_DIR": os.path.join(tempfile.gettempdir(), "startup-metrics"), "PYTHONDONTWRITEBYTECODE": "1"}
+
+def run_once(root, cwd):
+    "Boot phases from one fresh interpreter started in the empty directory `cwd`, plus the wall time of the whole process"
+    cwd = scratch(root, cwd)
+    start = time.perf_counter()
+    p = subprocess.run([sys.executable, "-c", CHILD], cwd=cwd, env=child_env(root), capture_output=True, text=True)
+    if p.returncode: raise RuntimeError(f"boot failed:\n{p.stderr}")
+    return dict(json.loads(p.stdout.strip().splitlines()[-1]), process_ms=round((time.perf_counter() - start) * 1000, 1))
+
+def parse_importtime(stderr):
+    "`(depth, self_us, cumulative_us, module)` per line of `-X importtime` output"
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        out.append(((len(name) - len(name.lstrip()) - 1) // 2, int(self_us), int(cum_us), name.strip()))
+    return out
+
+def import_profile(root, cwd, top):
+    "Which modules importing `main` costs, from `-X importtime` (which adds overhead of its own, so use it for shares)"
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=scratch(root, cwd), env=child_env(root), capture_output=True, text=True)
+    lines = parse_importtime(p.stderr)
+    end = next(i for i, l in enumerate(lines) if l[3] == "main" and l[0] == 0)
+    # A module's imports are the lines before it, back to the previous line at its own depth or shallower
+    begin = max((i for i in range(end) if lines[i][0] == 0), default=-1) + 1
+    tree = lines[begin:end]
+    packages = {}
+    for _, self_us, _, name in tree: packages[name.split(".")[0]] = packages.get(name.split(".")[0], 0) + self_us
+    ms = lambda us: round(us / 1000, 1)
+    return dict(total_ms=ms(lines[end][2]),
+                direct=[dict(module=n, ms=ms(c)) for d, _, c, n in sorted(tree, key=lambda l: -l[2]) if d == 1][:top],
+                packages=[dict(package=n, ms=ms(us)) for n, us in sorted(packages.items(), key=lambda o: -o[1])][:top],
+                slowest=[dict(module=n, self_ms=ms(s)) for _, s, _, n in sorted(tree, key=lambda l: -l[1])][:top])
+
+def git_commit(root):
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True).stdout.strip() or None
+    except OSError: return None
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--top", type=int, default=15, help="modules to list per table")
+    p.add_argument("--max-boot-ms", type=float, help="fail if the median boot takes longer")
+    p.add_argument("--compare", help="earlier JSON output to check against")
+    p.add_argument("--max-regression", type=float, default=20, help="with --compare: fail if boot grew by more than this many percent")
+    args = p.parse_args()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        with tempfile.TemporaryDirectory(prefix="startup-") as tmp:
+            runs = [run_once(root, tempfile.mkdtemp(dir=tmp)) for _ in range(args.runs)]
+            imports = import_profile(root, tempfile.mkdtemp(dir=tmp), args.top)
+    except RuntimeError as e: sys.exit(str(e))
+    median = {k: round(statistics.median(r[k] for r in runs), 1) for k in ("import_ms", "startup_ms", "first_request_ms", "boot_ms", "process_ms")}
+    res = dict(meta=dict(commit=git_commit(root), python=sys.version.split()[0], runs=args.runs), median=median,
+               runs=runs, imports=imports)
+    print(json.dumps(res, indent=2))
+    failures = []
+    if args.max_boot_ms and median["boot_ms"] > args.max_boot_ms:
+        failures.append(f"median boot {median['boot_ms']} ms is over the {args.max_boot_ms:g} ms budget")
+    if args.compare:
+        with open(args.compare) as f: old = json.load(f)["median"]
+        for k in ("import_ms", "startup_ms", "boot_ms"): print(f"{k:>16} {old[k]:>8.1f} -> {median[k]:>8.1f} ms ({(median[k] - old[k]) / old[k] * 100:+.0f}%)", file=sys.stderr)
+        if median["boot_ms"] > old["boot_ms"] * (1 + args.max_regression / 100):
+            failures.append(f"boot grew from {old['boot_ms']} to {median['boot_ms']} ms, over the {args.max_regression:g}% allowed")
+    if failures: sys.exit("\n".join(failures))
@@ -3,26 +3,25 @@ from fasthtml.oauth import OAuth, GitHubAppClient, http_patterns, url_match
 from monsterui.all import *
 from app.ui import *
 from app.api import *
-import os
+from app.aio import adb
+from app.images import image_variants
+from app.compress import CompressMiddleware
+from app.cache import ConditionalMiddleware, request_kind
+from app.timing import TimingMiddleware, timer
+from app.metrics import MetricsMiddleware, metrics
+from app.posts import posts
+from app.assets import asset_headers
+from app.highlight import highlight_css, highlight_css_url
+from functools import partial
+import asyncio, contextvars, os
 import dotenv
 
 dotenv.load_dotenv()
 
-hdrs = Theme.blue.headers(highlightjs=True)
+GITHUB_INSIGHTS_TIMEOUT = float(os.getenv("GITHUB_INSIGHTS_TIMEOUT", 3))
 
-tailwind_config = """
-    <script>
-        tailwind.config = {
-            darkMode: ['class', '[class="uk-theme-dark"]'],  // Match uk-theme-dark
-            theme: {
-                extend: {}
-            }
-        }
-    </script>
-    """
-
-# Insert the tailwind config before the existing script
-hdrs.insert(-3, Safe(tailwind_config))
+# Fingerprinted local copies once `python -m app.assets` has run, else the CDN originals
+hdrs = asset_headers()
 
 client = GitHubAppClient(os.getenv("GITHUB_CLIENT_ID"),
                          os.getenv("GITHUB_CLIENT_SECRET"))
@@ -32,13 +31,17 @@ class Auth(OAuth):
                  logout_path='/logout', login_path='/login', https=True, http_patterns=http_patterns):
         if not skip: skip = [redir_path,error_path,login_path]
         store_attr()
-        def before(req, session):
+        async def before(req, session):
             auth = req.scope['auth'] = session.get('auth')
             if not auth: return
-            # Also add token to request scope
-            req.scope['token'] = session.get('github_token')
-            res = self.check_invalid(req, session, auth)
-            if res: return res
+            with timer('auth'):
+                # Also add token to request scope
+                req.scope['token'] = session.get('github_token')
+                res = self.check_invalid(req, session, auth)
+                if res: return res
+                # Resolve the user once; get_user() reuses it for the rest of the request
+                user = req.scope['user'] = await adb.get_user(auth)
+                request_user.set(user)
         app.before.append(Beforeware(before, skip=skip))
 
         @app.get(redir_path)
@@ -74,28 +77,92 @@ class Auth(OAuth):
         sign_in(info)
         return RedirectResponse('/', status_code=303)
 
-app, rt = fast_app(hdrs=hdrs)
+async def mark_partial(req):
+    # Async so the ContextVar is set in the task that goes on to run the handler
+    partial_request.set(request_kind(req.headers) == 'partial')
+
+# `FastHTML` rather than `fast_app`, which imports its Pico helpers (and IPython, where installed) even with default_hdrs=False.
+# The database is opened and migrated on startup, not at import, so workers boot without touching it
+app = FastHTML(hdrs=hdrs, default_hdrs=False, before=mark_partial, middleware=[Middleware(MetricsMiddleware), Middleware(TimingMiddleware), Middleware(ConditionalMiddleware), Middleware(CompressMiddleware)], on_startup=[pool.open, view_counter.start, wal_shipper.start, metrics.start], on_shutdown=[view_counter.stop, wal_shipper.stop, adb.shutdown, metrics.stop])
+app.static_route_exts()
+rt = app.route
 
 oauth = Auth(app, client)
 
+# Gauges for /metrics, read from each subsystem's stats() whenever this worker snapshots its metrics
+for prefix, obj in [('db_pool', pool), ('db_executor', adb), ('view_counter', view_counter), ('page_cache', page_cache),
+                    ('user_cache', user_cache), ('github', github_stats), ('images', image_variants), ('posts', posts),
+                    ('backups', backups), ('wal_backup', wal_shipper)]:
+    metrics.source(prefix, obj.stats)
+
 @rt
-def index(auth):
-    return Home(auth=auth)
+def index(req, auth):
+    return page_cache.cached(req, lambda: Home(auth=auth), 'index', auth=auth)
 
 @rt("/blogposts")
-def blogs(auth):
-    return ListBlogs(auth=auth)
+def blogs(req, auth):
+    return page_cache.cached(req, lambda: ListBlogs(auth=auth), 'blogposts', auth=auth)
 
 @rt("/projects")
-def projects(auth):
-    return ListProjects(auth=auth)
+def projects(req, auth):
+    return page_cache.cached(req, lambda: ListProjects(auth=auth), 'projects', auth=auth)
+
+@rt("/blogposts/more")
+def more_blogs(req, cursor:str=None, limit:int=PAGE_SIZE):
+    return page_cache.cached(req, lambda: BlogGridItems(*get_blog_posts_page(cursor, limit)), 'blogposts/more', cursor, limit)
+
+@rt("/projects/more")
+def more_projects(req, cursor:str=None, limit:int=PAGE_SIZE):
+    return page_cache.cached(req, lambda: ProjectGridItems(*get_projects_page(cursor, limit)), 'projects/more', cursor, limit)
+
+@rt("/search/blogs")
+def blog_search(q:str=""):
+    if not q.strip(): return BlogGridItems(*get_blog_posts_page())
+    results = search_blog_posts(q)
+    return BlogGridItems(results) if results else NoResults()
+
+@rt("/search/projects")
+def project_search(q:str=""):
+    if not q.strip(): return ProjectGridItems(*get_projects_page())
+    results = search_projects(q)
+    return ProjectGridItems(results) if results else NoResults()
+
+@rt("/search/contacts")
+def contact_search(q:str="", auth=None):
+    user = get_user(auth)
+    if not user or not user.is_admin: return ""
+    results = search_contact_requests(q) if q.strip() else get_contact_requests()
+    return tuple(map(ContactRequestCard, results)) if results else NoResults("No matching contact requests.")
 
 @rt("/blog/{slug:str}")
 def blogpost(req, slug:str, auth=None):
-    blogpost = get_blog_post(slug)
-    if not blogpost: return RedirectResponse("/blogposts", status_code=303)
-    add_blog_view(slug)
-    return BlogPostPage(post=blogpost, auth=auth, token=req.scope.get('token'))
+    # Checked before the cache so an unknown slug can neither get a 304 nor be counted
+    if not blog_exists(slug): return RedirectResponse("/blogposts", status_code=303)
+    def render():
+        blogpost = get_blog_post(slug)
+        if not blogpost: return RedirectResponse("/blogposts", status_code=303)
+        return BlogPostPage(post=blogpost, auth=auth)
+    # The post's content hash keys the cached page and its ETag, so editing the Markdown shows up without a restart
+    res = page_cache.cached(req, render, 'blog', slug, posts.version(slug), auth=auth)
+    if res.status_code in (200, 304): add_blog_view(slug)
+    return res
+
+@rt("/highlight/{digest}")
+def highlight_stylesheet(digest:str):
+    # Fingerprinted by `highlight_css_url`; a page from before a restart may still ask for an older digest
+    fresh = highlight_css_url().endswith(f"/{digest}")
+    return Response(highlight_css(), media_type="text/css",
+                    headers={'Cache-Control': 'public, max-age=31536000, immutable' if fresh else 'no-cache'})
+
+@rt("/img/{digest}/{fmt}/{width}")
+def image_variant(digest:str, fmt:str, width:int): return image_variants.response(digest, fmt, width)
+
+@rt("/github/insights")
+async def github_insights(req, auth=None):
+    # Run off the DB pool and stop waiting after the timeout; an abandoned fetch still lands in the GitHub cache
+    fetch = partial(contextvars.copy_context().run, GithubInsights, auth, req.scope.get('token'))
+    try: return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(None, fetch), GITHUB_INSIGHTS_TIMEOUT)
+    except asyncio.TimeoutError: return GithubInsightsError()
 
 
 @rt("/login")
@@ -120,7 +187,7 @@ async def contact(contact:ContactRequest):
     email = contact.email
     message = contact.message
     contact_data = {'name': name,'email': email,'message': message}
-    store_contact_request(contact_data)
+    await adb.store_contact_request(contact_data)
     
     return Alert(
         DivLAligned(
@@ -132,12 +199,12 @@ async def contact(contact:ContactRequest):
 
 @app.post("/api/projects/new")
 async def new_project(project:Project):
-    create_project(project)
+    await adb.create_project(project)
     return ""
 
 @app.post("/api/blogs/new")
 async def new_blog(blog:Blog):
-    create_blog_post(blog)
+    await adb.create_blog_post(blog)
     return ""
 
 @rt("/contact/delete/{id}")
@@ -154,39 +221,47 @@ def toggle(id: int):
 def admin(session,auth=None):
     return AdminPage(session, auth)
 
-@rt("/admin/download/{filename:str}")
-def download_db_file(filename: str, auth=None, session=None):
-    if (not auth or not get_user(auth).is_admin) and not session.get('admin_access'):
-        return RedirectResponse("/", status_code=303)
+def is_admin(auth, session):
+    user = get_user(auth)
+    return bool(user and user.is_admin) or bool(session.get('admin_access'))
+
+@app.post("/admin/backup")
+def start_backup(auth=None, session=None):
+    if not is_admin(auth, session): return RedirectResponse("/", status_code=303)
+    return BackupStatus(backups.start())
+
+@rt("/admin/backup/{id}")
+def backup_status(id:str, auth=None, session=None):
+    if not is_admin(auth, session): return RedirectResponse("/", status_code=303)
+    return BackupStatus(backups.get(id))
+
+@rt("/admin/backup/{id}/download")
+def backup_download(id:str, encoding:str='', auth=None, session=None):
+    if not is_admin(auth, session): return RedirectResponse("/", status_code=303)
+    job = backups.get(id)
+    if job is None or job.status != 'done' or encoding not in BACKUP_ENCODINGS:
+        return RedirectResponse("/admin?error=backup-not-ready", status_code=303)
+    name = job.name + BACKUP_ENCODINGS[encoding]
+    # Sync iterator: Starlette reads it on the threadpool, so large snapshots never stall the event loop
+    return StreamingResponse(backups.stream(job, encoding), media_type="application/octet-stream",
+                             headers={'Content-Disposition': f'attachment; filename="{name}"',
+                                      **({'Content-Length': str(job.size)} if not encoding else {})})
 
-    try:
-        return FileResponse(
-            filename,
-            filename=filename,
-            media_type="application/octet-stream"
-        )
-    except FileNotFoundError:
-        return RedirectResponse("/admin?error=file-not-found", status_code=303)
-    
 @rt("/admin/upload")
 async def upload_database(request, auth=None, session=None):
-    if (not auth or not get_user(auth).is_admin) and not session.get('admin_access'):
-        return RedirectResponse("/", status_code=303)
+    if not is_admin(auth, session): return RedirectResponse("/", status_code=303)
     
+    # Multipart uploads are spooled to disk by Starlette, so nothing here holds the whole file in memory
     form = await request.form()
-    files = form.getlist('database')
+    file = form.get('database')
     
     try:
-        for file in files:
-            if not isinstance(file, UploadFile): continue
-            content = await file.read()
-            with open(file.filename, 'wb') as f:
-                f.write(content)
-        
+        if not isinstance(file, UploadFile): raise ValueError("no file selected")
+        counts = await adb.restore_database(file.file, file.filename or '')
         return Alert(
             DivLAligned(
                 UkIcon("check-circle"),
-                P("Database files uploaded successfully!", cls="text-white")
+                P(f"Database restored: {', '.join(f'{n} {tbl}' for tbl, n in counts.items())}.", cls="text-white")
             ),
             cls=AlertT.success
         )
@@ -194,11 +269,19 @@ async def upload_database(request, auth=None, session=None):
         return Alert(
             DivLAligned(
                 UkIcon("alert-triangle"),
-                P(f"Error uploading files: {str(e)}", cls="text-white")
+                P(f"Error restoring database: {str(e)}", cls="text-white")
             ),
             cls=AlertT.error
         )
     
+@rt("/metrics")
+def metrics_endpoint(req, auth=None, session=None):
+    # Scrapers can't log in, so they present METRICS_TOKEN as a bearer token instead
+    token = os.getenv("METRICS_TOKEN")
+    if not (is_admin(auth, session) or (token and req.headers.get('authorization') == f"Bearer {token}")):
+        return Response("Forbidden", status_code=403)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @rt("/admin/login")
 async def admin_login(request, session):
     form = await request.form()
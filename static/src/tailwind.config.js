@@ -0,0 +1,6 @@
+tailwind.config = {
+    darkMode: ['class', '[class="uk-theme-dark"]'],  // Match uk-theme-dark
+    theme: {
+        extend: {}
+    }
+}
@@ -0,0 +1,49 @@
+// Check and apply theme on page load
+function applyTheme() {
+    const html = document.documentElement;
+    const isDark = localStorage.theme === 'dark' || 
+        (!('theme' in localStorage) && window.matchMedia('(prefers-color-scheme: dark)').matches);
+
+    // Ensure uk-theme-blue is always present
+    if (!html.classList.contains('uk-theme-blue')) {
+        html.classList.add('uk-theme-blue');
+    }
+
+    // Handle dark/light theme
+    if (isDark) {
+        html.classList.add('dark');
+    } else {
+        html.classList.remove('dark');
+    }
+}
+
+// Apply theme immediately
+applyTheme();
+
+// Function to toggle theme
+function toggleTheme() {
+    const html = document.documentElement;
+    if (html.classList.contains('dark')) {
+        html.classList.remove('dark');
+        localStorage.theme = 'light';
+    } else {
+        html.classList.add('dark');
+        localStorage.theme = 'dark';
+    }
+    // Ensure uk-theme-blue remains
+    if (!html.classList.contains('uk-theme-blue')) {
+        html.classList.add('uk-theme-blue');
+    }
+}
+
+// Watch system theme changes
+window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', e => {
+    if (!('theme' in localStorage)) {
+        applyTheme();
+    }
+});
+
+// Boosted page links swap #content in place, so close the mobile menu they may have been clicked from
+document.addEventListener('htmx:afterSwap', e => {
+    if (e.detail.target.id === 'content' && window.UIkit) UIkit.modal('#mobile-menu')?.hide();
+});
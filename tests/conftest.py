@@ -0,0 +1,14 @@
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="session", autouse=True)
+def site_dir(tmp_path_factory):
+    "Run from a scratch directory, like a fresh deploy, so the database and caches never land in the checkout"
+    d = tmp_path_factory.mktemp("site")
+    for name in ("static", "blogposts"): os.symlink(os.path.join(ROOT, name), d/name)
+    cwd = os.getcwd()
+    os.chdir(d)
+    yield d
+    os.chdir(cwd)
@@ -0,0 +1,71 @@
+import io, os, time
+import apsw, pytest
+from app.backup import ENCODINGS, Backups, restore, validate_database
+from app.db import ConnectionPool
+from app.search import search
+
+@pytest.fixture
+def live(tmp_path):
+    pool = ConnectionPool(str(tmp_path/"live.sqlite"))
+    with pool.write() as db:
+        for i in range(40):
+            db.t.blog.insert(dict(title=f"Post {i}", description="about sqlite backups" if i % 2 else "gardening", tags="",
+                                  url_slug=f"post-{i}", published=True, created_at="2024-01-01", views=i))
+        db.t.project.insert(dict(title="Site", description="this site", tags="python", created_at="2024-01-01"))
+    return pool
+
+def snapshot(backups):
+    "Run a backup to completion"
+    job = backups.start()
+    deadline = time.monotonic() + 10
+    while job.status == 'running' and time.monotonic() < deadline: time.sleep(0.01)
+    assert job.status == 'done', job.error
+    return job
+
+@pytest.mark.parametrize("encoding", ['', 'gzip', 'zstd'])
+def test_backup_and_restore(tmp_path, live, encoding):
+    if encoding not in ENCODINGS: pytest.importorskip("zstandard")
+    # Small steps, so the copy takes several and reports progress along the way
+    backups = Backups(live.path, dir=tmp_path, pages_per_step=2)
+    job = snapshot(backups)
+    assert job.progress == 1.0 and job.pages > 2 and not validate_database(job.dest)
+    upload = io.BytesIO(b''.join(backups.stream(job, encoding)))
+    # Into a database with other contents, already open and read from, as the app's would be
+    target = ConnectionPool(str(tmp_path/"target.sqlite"))
+    with target.write() as db: db.t.blog.insert(dict(title="Only here", description="", tags="", url_slug="only-here", published=True))
+    reader = target.reader()
+    assert len(search(reader, 'blog', "here")) == 1
+    counts = restore(target, upload, f"{job.name}{ENCODINGS[encoding]}")
+    assert counts['blog'] == 40 and counts['project'] == 1 and target.generation == 1
+    # The connection opened before the restore sees the new contents, search index included
+    assert reader.execute("SELECT count(*) FROM blog").fetchone()[0] == 40
+    assert search(reader, 'blog', "here") == [] and len(search(reader, 'blog', "backup")) == 20
+    assert [o['title'] for o in search(reader, 'project', "pyth")] == ["Site"]
+    assert reader.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+
+@pytest.mark.parametrize("data,filename,problem", [
+    (b"definitely not sqlite" * 100, "backup.sqlite", "not a SQLite database"),
+    (b"", "backup.sqlite", "not a SQLite database"),
+    (b"\x1f\x8b garbage", "backup.sqlite.gz", None),
+])
+def test_garbage_uploads_are_rejected(tmp_path, live, data, filename, problem):
+    with pytest.raises((ValueError, OSError), match=problem): restore(live, io.BytesIO(data), filename)
+    # The live database is untouched, and no temp file is left behind
+    assert live.reader().execute("SELECT count(*) FROM blog").fetchone()[0] == 40 and live.generation == 0
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith('.restore-')) == []
+
+def test_databases_missing_the_schema_are_rejected(tmp_path, live):
+    other = apsw.Connection(str(tmp_path/"other.sqlite"))
+    other.execute("CREATE TABLE blog (id INTEGER PRIMARY KEY, title TEXT)")
+    other.close()
+    problems = validate_database(str(tmp_path/"other.sqlite"))
+    assert "missing table user" in problems and any(p.startswith("blog is missing") for p in problems)
+    with open(tmp_path/"other.sqlite", 'rb') as f:
+        with pytest.raises(ValueError, match="missing table"): restore(live, f, "other.sqlite")
+
+def test_purge_forgets_old_jobs(tmp_path, live):
+    backups = Backups(live.path, dir=tmp_path, ttl=0)
+    job = snapshot(backups)
+    job.finished -= 1
+    backups.purge()
+    assert backups.get(job.id) is None and not os.path.exists(job.dest)
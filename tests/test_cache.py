@@ -0,0 +1,93 @@
+import time
+import pytest
+from fasthtml.common import FastHTML, P
+from starlette.datastructures import Headers
+from starlette.testclient import TestClient
+from app.cache import PageCache, TTLCache, not_modified
+
+def test_ttl_expiry():
+    c = TTLCache(ttl=0.05)
+    c.set('a', 1)
+    assert c.get('a') == 1
+    time.sleep(0.06)
+    assert c.get('a') is None and len(c) == 0
+    assert c.stats()['hits'] == 1 and c.stats()['misses'] == 1
+
+def test_lru_eviction():
+    c = TTLCache(maxsize=2)
+    c.set('a', 1), c.set('b', 2)
+    c.get('a')
+    c.set('c', 3)
+    assert c.get('b') is None and c.get('a') == 1 and c.get('c') == 3
+    assert c.pop('a') == 1 and c.pop('a') is None
+
+def serve(cache):
+    "A client for one page cached by `cache` (auth from an `x-user` header), and the list of what it rendered"
+    app, renders = FastHTML(), []
+    @app.get("/")
+    def index(req):
+        auth = req.headers.get('x-user')
+        return cache.cached(req, lambda: renders.append(auth) or P(f"hello {auth}"), 'index', auth=auth)
+    return TestClient(app), renders
+
+def test_pages_are_cached_per_auth_and_request_kind():
+    client, renders = serve(PageCache())
+    for user in ('', 'ann', '', 'ann'): client.get("/", headers={'x-user': user})
+    assert renders == ['', 'ann']
+    res = client.get("/", headers={'x-user': 'ann'})
+    assert res.headers['x-cache'] == 'HIT' and "hello ann" in res.text
+    # An HTMX fragment of the same route is a different body
+    assert client.get("/", headers={'x-user': 'ann', 'HX-Request': '1'}).headers['x-cache'] == 'MISS'
+
+def test_invalidate_drops_every_page():
+    cache = PageCache()
+    client, renders = serve(cache)
+    client.get("/")
+    version = cache.version
+    cache.invalidate()
+    assert cache.version == version + 1 and len(cache.pages) == 0
+    assert client.get("/").headers['x-cache'] == 'MISS' and len(renders) == 2
+
+def test_disabled_cache_still_answers_conditional_requests():
+    cache = PageCache(enabled=False, stamp=lambda: ("v1", "2024-01-01T00:00:00"))
+    client, renders = serve(cache)
+    res = client.get("/")
+    assert res.headers['x-cache'] == 'BYPASS' and res.headers['etag']
+    assert client.get("/", headers={'If-None-Match': res.headers['etag']}).status_code == 304
+    assert client.get("/", headers={'If-Modified-Since': res.headers['last-modified']}).status_code == 304
+    assert len(renders) == 1
+    # Signed-in pages get a tag of their own
+    assert client.get("/", headers={'x-user': 'ann', 'If-None-Match': res.headers['etag']}).status_code == 200
+
+@pytest.mark.parametrize("inm,match", [('"a"', True), ('W/"a"', True), ('"b", "a"', True), ('"a-gzip"', True), ('"b"', False), ('*', False)])
+def test_if_none_match(inm, match):
+    assert not_modified(Headers({'if-none-match': inm}), '"a"') is match
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+    with TestClient(main.app) as c: yield c
+
+def test_second_homepage_request_is_a_hit_and_revalidates(client):
+    from app.api import page_cache
+    page_cache.invalidate()
+    first, second = client.get("/"), client.get("/")
+    assert first.headers['x-cache'] == 'MISS' and second.headers['x-cache'] == 'HIT'
+    assert second.text == first.text
+    res = client.get("/", headers={'If-None-Match': first.headers['etag']})
+    assert res.status_code == 304 and not res.content
+
+def test_writes_invalidate_the_homepage(client):
+    from app.api import create_blog_post, page_cache, writer
+    from app.db import Blog
+    etag = client.get("/").headers['etag']
+    assert client.get("/").headers['x-cache'] == 'HIT'
+    post = create_blog_post(Blog(title="Cache test", description="d", url_slug="cache-test", published=True, tags=""))
+    try:
+        res = client.get("/", headers={'If-None-Match': etag})
+        assert res.status_code == 200 and res.headers['x-cache'] == 'MISS' and res.headers['etag'] != etag
+        assert "Cache test" in res.text
+    finally:
+        # The session database is shared, and other tests expect it empty
+        with writer() as db: db.t.blog.delete(post.id)
+        page_cache.invalidate()
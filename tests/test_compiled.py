@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+import pytest
+from fasthtml.common import Div, to_xml
+import app.ui as ui
+from app.compiled import Compiled
+
+BLOG = dict(title="Post", description="About python", image_url="/static/personal_site.png", created_at="2024-03-05T10:00:00.000000",
+            url_slug="post", views=7, tags="python, web")
+PROJECT = dict(title="Project", description="Something built", image_url="/static/personal_site.png", project_url="https://example.com",
+               github_url="https://github.com/example", featured=True, status="completed", tags="python")
+# Markup, quotes and entities in every text field, plus the fields a row may leave NULL
+SPECIAL = dict(title='<script>alert("x")</script> & \'quotes\'', description="a < b && c > d &amp; {braces}", tags="<b>, a&b, \"q\", ")
+
+BLOGS = [BLOG, {**BLOG, **SPECIAL}, {**BLOG, 'url_slug': 'a"b&c<d>', 'image_url': '/static/x y&z.png', 'views': 0},
+         {**BLOG, 'tags': None}, {**BLOG, 'tags': ''}, {**BLOG, 'description': None, 'image_url': None, 'views': None}]
+PROJECTS = [PROJECT, {**PROJECT, **SPECIAL}, {**PROJECT, 'featured': False, 'status': 'in-progress', 'project_url': 'https://e.com/?a=1&b="2"'},
+            {**PROJECT, 'github_url': None, 'project_url': None, 'status': 'archived'}, {**PROJECT, 'status': 'something else', 'tags': None},
+            {**PROJECT, 'featured': None, 'description': None, 'image_url': None}]
+
+def html(ft): return to_xml(Div(ft), indent=False)
+
+@pytest.mark.parametrize("row", BLOGS)
+def test_blog_cards_match(row):
+    row = SimpleNamespace(**row)
+    assert html(ui.GridBlogCard(row)) == html(ui.BlogCard(row))
+
+@pytest.mark.parametrize("row", PROJECTS)
+def test_project_cards_match(row):
+    row = SimpleNamespace(**row)
+    assert html(ui.GridProjectCard(row)) == html(ui.ProjectCard(row))
+
+def test_special_fields_are_escaped():
+    out = html(ui.GridBlogCard(SimpleNamespace(**{**BLOG, **SPECIAL})))
+    assert '<script>' not in out and '&lt;script&gt;' in out and '<b>' not in out
+
+def test_grids_match(monkeypatch):
+    blogs, projects = [SimpleNamespace(**o) for o in BLOGS], [SimpleNamespace(**o) for o in PROJECTS]
+    def both(build):
+        monkeypatch.setattr(ui, 'COMPILED_CARDS', True)
+        fast = build()
+        monkeypatch.setattr(ui, 'COMPILED_CARDS', False)
+        return html(fast), html(build())
+    for build in (lambda: ui.LatestBlogs(blogs), lambda: ui.BlogGridItems(blogs, "next"), lambda: ui.ProjectsSection(projects)):
+        fast, slow = both(build)
+        assert fast == slow
+
+def test_fields_must_fill_whole_values():
+    with pytest.raises(ValueError, match="part of an attribute"): Compiled(lambda href: Div(hx_get=f"/x/{href}")).html(href="a")
@@ -0,0 +1,80 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from starlette.testclient import TestClient
+from app.cache import ConditionalMiddleware
+from app.compress import ENCODINGS, CompressMiddleware, compress, negotiate, precompress_static
+
+BODY = "hello compression " * 100
+
+def client(body=BODY, media_type="text/html", headers=None, **kw):
+    "`ConditionalMiddleware` around `CompressMiddleware` around one page, stacked the way main.py does"
+    page = lambda req: PlainTextResponse(body, media_type=media_type, headers=headers)
+    return TestClient(ConditionalMiddleware(CompressMiddleware(Starlette(routes=[Route("/", page)]), **kw)))
+
+def test_each_encoding_gets_a_strong_etag_of_its_own():
+    c = client(headers={'ETag': '"abc"'})
+    gz, plain = c.get("/", headers={'Accept-Encoding': 'gzip'}), c.get("/", headers={'Accept-Encoding': 'identity'})
+    assert gz.headers['content-encoding'] == 'gzip' and gz.headers['etag'] == '"abc-gzip"'
+    assert plain.headers['etag'] == '"abc"'
+    assert gz.headers['vary'] == plain.headers['vary'] == 'Accept-Encoding'
+    # Revalidating with either representation's tag matches the page
+    for tag, enc in (('"abc-gzip"', 'gzip'), ('"abc"', 'gzip'), ('"abc-gzip"', 'identity'), ('W/"abc-br"', 'gzip')):
+        assert c.get("/", headers={'Accept-Encoding': enc, 'If-None-Match': tag}).status_code == 304
+    assert c.get("/", headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"abd-gzip"'}).status_code == 200
+
+@pytest.mark.parametrize("accept,encodings,expected", [
+    ('gzip, deflate, br', ('br', 'gzip'), 'br'),
+    ('br;q=0, gzip', ('br', 'gzip'), 'gzip'),
+    ('br;q=0, gzip;q=0', ('br', 'gzip'), None),
+    ('*', ('br', 'gzip'), 'br'),
+    ('*;q=0', ('br', 'gzip'), None),
+    ('br;q=0, *', ('br', 'gzip'), 'gzip'),
+    ('GZIP;q=0.5', ('br', 'gzip'), 'gzip'),
+    ('br;q=oops, gzip', ('br', 'gzip'), 'gzip'),
+    ('identity', ('br', 'gzip'), None),
+    ('', ('br', 'gzip'), None),
+    ('br', ('gzip',), None),
+])
+def test_negotiate(accept, encodings, expected):
+    assert negotiate(accept, encodings) == expected
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_compressed_responses(encoding):
+    res = client().get("/", headers={'Accept-Encoding': encoding})
+    assert res.headers['content-encoding'] == encoding and res.headers['vary'] == 'Accept-Encoding'
+    # httpx has already decoded the body; the length is that of the bytes on the wire
+    assert int(res.headers['content-length']) == len(compress(BODY.encode(), encoding)) < len(BODY)
+    assert res.text == BODY
+
+def test_small_bodies_are_left_alone():
+    res = client(body="tiny").get("/", headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in res.headers and res.headers['content-length'] == '4'
+    # Whether it compresses depends on the encoding asked for, so caches still need to know
+    assert res.headers['vary'] == 'Accept-Encoding'
+    assert 'content-encoding' in client(body="tiny", min_size=1).get("/", headers={'Accept-Encoding': 'gzip'}).headers
+
+@pytest.mark.parametrize("media_type", ["image/png", "application/zip", "font/woff2"])
+def test_incompressible_types_are_left_alone(media_type):
+    res = client(media_type=media_type).get("/", headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in res.headers and 'vary' not in res.headers
+    assert res.headers['content-length'] == str(len(BODY))
+
+def test_streamed_bodies_are_compressed_per_chunk():
+    async def chunks():
+        for _ in range(5): yield BODY
+    app = Starlette(routes=[Route("/", lambda req: StreamingResponse(chunks(), media_type="text/html"))])
+    res = TestClient(CompressMiddleware(app)).get("/", headers={'Accept-Encoding': 'gzip'})
+    assert res.headers['content-encoding'] == 'gzip' and 'content-length' not in res.headers
+    assert res.text == BODY * 5
+
+def test_precompressed_static_siblings(tmp_path):
+    (tmp_path/"static").mkdir()
+    (tmp_path/"static"/"app.css").write_text("body { color: red }\n" * 100)
+    assert {(src.name, enc) for src, enc, *_ in precompress_static(tmp_path/"static")} == {("app.css", e) for e in ENCODINGS}
+    mw = CompressMiddleware(Starlette(routes=[Mount("/static", StaticFiles(directory=tmp_path/"static"))]), static_dir=tmp_path/"static")
+    res = TestClient(mw).get("/static/app.css", headers={'Accept-Encoding': 'gzip'})
+    assert res.headers['content-encoding'] == 'gzip' and res.headers['content-type'].startswith('text/css')
+    assert res.text == "body { color: red }\n" * 100 and mw.static_hits == 1
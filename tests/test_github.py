@@ -0,0 +1,39 @@
+import pytest
+from app.db import ConnectionPool
+from app.github import GitHubStats
+from bench.fake_github import FakeGitHub, fake_user
+
+@pytest.fixture
+def github():
+    srv = FakeGitHub().start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+@pytest.fixture
+def pool(tmp_path): return ConnectionPool(str(tmp_path/"github.sqlite"))
+
+def test_stats_from_the_api(pool, github):
+    stats = GitHubStats(pool, github.url).get("octocat")
+    assert stats == dict(repos=12, followers=34, following=5, created_at="2015-06-01",
+                         top_languages=[("Python", 2), ("JavaScript", 1), ("Rust", 1)])
+
+def test_cached_then_revalidated(pool, github):
+    gh = GitHubStats(pool, github.url)
+    first = gh.get("octocat")
+    assert gh.get("octocat") == first and github.requests == 2 and gh.hits == 2
+    gh.ttl = 0
+    assert gh.get("octocat") == first
+    assert github.requests == 4 and github.not_modified == 2
+
+def test_stale_copy_when_github_is_down(pool, github):
+    gh = GitHubStats(pool, github.url, ttl=0, timeout=1)
+    first = gh.get("octocat")
+    github.shutdown()
+    github.server_close()
+    assert gh.get("octocat") == first and gh.stale == 2
+
+def test_no_copy_and_no_github_raises(pool):
+    with pytest.raises(OSError): GitHubStats(pool, "http://127.0.0.1:9", timeout=1).get("octocat")
+
+def test_fake_ids_are_stable(): assert fake_user("octocat")['id'] == 27039078
@@ -0,0 +1,66 @@
+import pytest
+from fastlite import database
+from app.db import ConnectionPool
+from app.search import fts_query, search, setup_search
+
+@pytest.fixture
+def db(tmp_path): return ConnectionPool(str(tmp_path/"search.sqlite")).open()
+
+def post(db, title, description="", tags="", **kw):
+    return db.t.blog.insert(dict(title=title, description=description, tags=tags, url_slug=title.lower().replace(' ', '-'),
+                                 published=True, created_at="2024-01-01") | kw)
+
+def titles(db, text, **kw): return [o['title'] for o in search(db, 'blog', text, **kw)]
+
+def test_triggers_keep_the_index_in_sync(db):
+    a = post(db, "SQLite tuning", "pragmas and indexes")
+    post(db, "Gardening", "tomatoes")
+    assert titles(db, "pragmas") == ["SQLite tuning"]
+    db.t.blog.update(dict(id=a['id'], description="write-ahead logging"))
+    assert titles(db, "pragmas") == [] and titles(db, "logging") == ["SQLite tuning"]
+    # Columns outside the index don't fire the update trigger, and leave the match alone
+    db.t.blog.update(dict(id=a['id'], views=3))
+    assert titles(db, "logging") == ["SQLite tuning"]
+    db.t.blog.delete(a['id'])
+    assert titles(db, "logging") == [] and titles(db, "tomatoes") == ["Gardening"]
+
+def test_title_matches_outrank_descriptions_and_tags(db):
+    post(db, "Notes", "all about python packaging")
+    post(db, "Python packaging", "notes")
+    post(db, "Misc", "notes", tags="python")
+    assert titles(db, "python") == ["Python packaging", "Notes", "Misc"]
+
+def test_every_word_prefix_matches(db):
+    post(db, "Async Python", "asyncio event loops")
+    post(db, "Python typing")
+    assert set(titles(db, "pyth")) == {"Async Python", "Python typing"}
+    assert titles(db, "asy pyt") == ["Async Python"]
+    # Diacritics are folded on both sides
+    assert titles(db, "pythön") and titles(db, "") == []
+
+def test_where_and_limit(db):
+    post(db, "Draft on caching", published=False)
+    post(db, "Published on caching")
+    assert titles(db, "caching", where="blog.published=?", where_args=[True]) == ["Published on caching"]
+    assert len(titles(db, "caching", limit=1)) == 1
+
+@pytest.mark.parametrize("text", ['"foo" OR bar*', 'NEAR(', 'a AND', '*', '"', "title:foo", "-foo", "foo)", "^foo", "{title}: x"])
+def test_fts_syntax_is_taken_literally(db, text):
+    post(db, "foo bar")
+    assert all(q.startswith('"') and q.endswith('"*') for q in fts_query(text).split(' ') if q)
+    search(db, 'blog', text)
+
+def test_fts_query_quotes_each_word():
+    assert fts_query('"foo" OR bar*') == '"foo"* "OR"* "bar"*'
+    assert fts_query('NEAR(') == '"NEAR"*'
+    assert fts_query(None) == fts_query(' -*') == ''
+
+def test_new_indexes_are_backfilled(tmp_path):
+    db = database(tmp_path/"old.sqlite")
+    db.execute("CREATE TABLE blog (id INTEGER PRIMARY KEY, title TEXT, description TEXT, tags TEXT)")
+    db.execute("CREATE TABLE project (id INTEGER PRIMARY KEY, title TEXT, description TEXT, tags TEXT)")
+    db.execute("CREATE TABLE contact (id INTEGER PRIMARY KEY, name TEXT, email TEXT, message TEXT)")
+    db.execute("INSERT INTO blog (title, description, tags) VALUES ('Written before search', '', '')")
+    setup_search(db)
+    setup_search(db)
+    assert titles(db, "before") == ["Written before search"]
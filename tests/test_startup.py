@@ -0,0 +1,13 @@
+import os
+from bench.startup import run_once
+
+# Generous, so only a real regression (an eager heavy import, work moved back to import time) trips it on a slow CI box;
+# bench/startup.py measures the actual numbers
+BOOT_BUDGET_MS = float(os.getenv("BOOT_BUDGET_MS", 3000))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_boot_within_budget(tmp_path):
+    # A fresh interpreter imports main, runs its startup hooks and serves /, from an empty directory like a new deploy
+    res = run_once(ROOT, str(tmp_path))
+    assert res['status'] == 200
+    assert res['boot_ms'] < BOOT_BUDGET_MS, f"import + startup took {res['boot_ms']} ms, over the {BOOT_BUDGET_MS:g} ms budget: {res}"
@@ -0,0 +1,16 @@
+import pytest
+from app.db import ConnectionPool
+from app.views import ViewCounter
+
+def test_failed_flush_keeps_the_views(tmp_path):
+    pool = ConnectionPool(str(tmp_path/"views.sqlite"))
+    counter = ViewCounter(pool)
+    with pool.write() as db: db.t.blog.insert(url_slug="post", views=1)
+    counter.add("post", 2)
+    with pool.write() as db: db.execute("ALTER TABLE blog RENAME TO blog_away")
+    with pytest.raises(Exception): counter.flush()
+    counter.add("post")
+    assert counter.pending_views("post") == 3
+    with pool.write() as db: db.execute("ALTER TABLE blog_away RENAME TO blog")
+    assert counter.flush() == 3
+    assert pool.reader().t.blog.get(1)['views'] == 4
@@ -0,0 +1,81 @@
+import os
+import apsw, pytest
+from app.backup import Backups
+from app.db import ConnectionPool
+from app.walbackup import WalShipper, created_at, generations, restore, segments
+
+@pytest.fixture
+def pool(tmp_path): return ConnectionPool(str(tmp_path/"live.sqlite"), pragmas=dict(wal_autocheckpoint=0))
+
+def add_contacts(pool, n):
+    with pool.write() as db:
+        for i in range(n): db.t.contact.insert(name=f"n{i}", email="e", message="m"*200, created_at="2024", deleted=False, responded=False)
+
+def restored(tmp_path, to=None):
+    out = tmp_path/f"restored-{to}.sqlite"
+    restore(tmp_path/"wal", out, to)
+    con = apsw.Connection(str(out))
+    try: return con.execute("SELECT count(*) FROM contact").fetchone()[0], con.execute("PRAGMA integrity_check").fetchone()[0]
+    finally: con.close()
+
+def test_ship_and_restore(tmp_path, pool):
+    shipper = WalShipper(pool, tmp_path/"wal")
+    add_contacts(pool, 10)
+    assert shipper.ship() == 0 and shipper.snapshots == 1
+    add_contacts(pool, 20)
+    assert shipper.ship() > 0
+    add_contacts(pool, 5)
+    shipper.ship()
+    [gen] = generations(tmp_path/"wal")
+    assert len(segments(gen)) == 2
+    assert restored(tmp_path) == (35, 'ok')
+    # Point in time: as of the base copy, before either segment
+    assert restored(tmp_path, created_at(gen)) == (10, 'ok')
+
+def test_wal_restart_keeps_the_generation(tmp_path, pool):
+    shipper = WalShipper(pool, tmp_path/"wal")
+    add_contacts(pool, 3)
+    shipper.ship()
+    add_contacts(pool, 4)
+    shipper.ship()
+    salt = shipper.salt
+    # Everything was backfilled with no reader in the way, so this commit starts the WAL over under a new salt
+    add_contacts(pool, 5)
+    assert shipper.ship() > 0 and shipper.salt != salt
+    assert shipper.snapshots == 1 and restored(tmp_path) == (12, 'ok')
+
+def test_lost_continuity_starts_a_new_generation(tmp_path, pool):
+    shipper = WalShipper(pool, tmp_path/"wal")
+    add_contacts(pool, 3)
+    shipper.ship()
+    add_contacts(pool, 4)
+    shipper.ship()
+    # As if frames had been checkpointed away before they were shipped
+    shipper.backfilled = False
+    add_contacts(pool, 5)
+    shipper.ship()
+    assert shipper.snapshots == 2 and len(generations(tmp_path/"wal")) == 2
+    assert restored(tmp_path) == (12, 'ok')
+
+def test_only_one_shipper_holds_the_lock(tmp_path, pool):
+    first, second = WalShipper(pool, tmp_path/"wal"), WalShipper(pool, tmp_path/"wal")
+    assert first.leader() and not second.leader()
+    add_contacts(pool, 2)
+    assert second.ship() == 0 and second.gen is None
+    first.ship()
+    assert first.snapshots == 1 and len(generations(tmp_path/"wal")) == 1
+
+def test_prune_keeps_the_current_generation(tmp_path, pool):
+    shipper = WalShipper(pool, tmp_path/"wal", retention=60)
+    add_contacts(pool, 1)
+    shipper.ship()
+    old = shipper.gen
+    shipper.pool_generation = None
+    shipper.ship()
+    for p in old.iterdir(): os.utime(p, (0, 0))
+    shipper.prune()
+    assert generations(tmp_path/"wal") == [shipper.gen]
+
+def test_backup_dirs_must_be_outside_the_site_root(pool):
+    with pytest.raises(ValueError, match="WAL_BACKUP_DIR"): WalShipper(pool, "backups")
+    with pytest.raises(ValueError, match="BACKUP_DIR"): Backups(pool.path, dir=os.path.join(os.getcwd(), "snapshots"))